@@ -0,0 +1,108 @@
+"""Пакетный опрос API для многих подписчиков сразу."""
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+from tracing import propagate
+
+
+class BatchResult:
+    """Ответ API для одного подписчика или ошибка его запроса."""
+
+    __slots__ = ("subscriber", "response", "error")
+
+    def __init__(self, subscriber, response=None, error=None):
+        self.subscriber = subscriber
+        self.response = response
+        self.error = error
+
+    def unwrap(self, *args):
+        """Возвращает ответ или выбрасывает ошибку запроса.
+
+        Принимает и игнорирует аргументы, чтобы подменять
+        `get_api_answer(fromdate)`.
+        """
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+class BatchFetcher:
+    """
+    Запрашивает API для группы подписчиков параллельно.
+
+    Число одновременных запросов ограничено `max_in_flight` на все
+    вызовы `fetch()`. Результаты отдаются по мере готовности.
+    Если задан `fetch_many(chunk)` (пакетный запрос, возвращающий
+    словарь token -> ответ), подписчики группируются по `batch_size`;
+    упавший пакет делится пополам, вплоть до одиночных запросов
+    `fetch_one(token, fromdate)`. Ошибка одного подписчика
+    не затрагивает остальных.
+    """
+
+    def __init__(self, fetch_one, fetch_many=None, max_in_flight=8,
+                 batch_size=50):
+        self.fetch_one = fetch_one
+        self.fetch_many = fetch_many
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="fetch"
+        )
+        self._pending = set()
+
+    def fetch(self, due):
+        """
+        Опрашивает подписчиков из `due` — пар (subscriber, fromdate).
+        Генерирует BatchResult в порядке готовности. Если генератор
+        закрыт раньше (цикл прерван), ещё не начатые запросы
+        отменяются.
+        """
+        due = list(due)
+        size = self.batch_size if self.fetch_many else 1
+        futures = [
+            self._executor.submit(
+                propagate(self._fetch_chunk), due[i:i + size]
+            )
+            for i in range(0, len(due), size)
+        ]
+        self._pending.update(futures)
+        for future in futures:
+            future.add_done_callback(self._pending.discard)
+        try:
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self, timeout=None):
+        """
+        Отменяет ещё не начатые запросы, до `timeout` секунд ждёт
+        выполняемые и останавливает потоки.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        wait(list(self._pending), timeout)
+
+    def _fetch_chunk(self, chunk):
+        if len(chunk) == 1:
+            subscriber, fromdate = chunk[0]
+            try:
+                response = self.fetch_one(subscriber.token, fromdate)
+            except Exception as error:
+                return [BatchResult(subscriber, error=error)]
+            return [BatchResult(subscriber, response)]
+        try:
+            responses = self.fetch_many(chunk)
+            return [
+                BatchResult(subscriber, responses[subscriber.token])
+                for subscriber, _ in chunk
+            ]
+        except Exception as error:
+            logging.warning(
+                f"Пакет из {len(chunk)} запросов не выполнен ({error}), "
+                "делим пополам."
+            )
+            middle = len(chunk) // 2
+            return (
+                self._fetch_chunk(chunk[:middle])
+                + self._fetch_chunk(chunk[middle:])
+            )
@@ -0,0 +1,82 @@
+"""
+Память состояния 100 тысяч подписчиков с общими строками и без них.
+
+Ответы разбираются json.loads, как при реальном опросе, поэтому
+каждая строка приходит новой копией. Имя файла работы, как в API,
+начинается с логина студента. В состояние входит и отчёт о последнем
+отправленном статусе: раньше — с полным текстом сообщения, теперь —
+со статусом. Запуск из корня репозитория:
+python benchmarks/bench_interning.py
+"""
+import json
+import os
+import sys
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault("PRACTICUM_TOKEN", "benchmark")
+
+import homework as bot  # noqa: E402
+from interning import HOMEWORK_FIELDS, Interner, intern_homework  # noqa
+
+USERS = 100_000
+LESSONS = [
+    f"Спринт {sprint}. Проект: {title}"
+    for sprint, title in enumerate(
+        ("Лендинг", "Бот-ассистент", "Блог", "API для Yatube", "Фудграм",
+         "Kittygram", "Финальный проект", "CI и CD", "Тестирование"),
+        start=1,
+    )
+]
+STATUSES = ("approved", "reviewing", "rejected")
+
+
+def payloads():
+    for user in range(USERS):
+        sprint = user % len(LESSONS)
+        yield json.dumps({
+            "status": STATUSES[user % len(STATUSES)],
+            "homework_name": f"student{user}__hw{sprint + 1:02}_final.zip",
+            "lesson_name": LESSONS[sprint],
+            "date_updated": "2023-03-27T14:07:38Z",
+        }, ensure_ascii=False)
+
+
+def plain(homework):
+    meta = {field: homework.get(field) for field in HOMEWORK_FIELDS}
+    meta["date_updated"] = homework.get("date_updated")
+    report = {
+        "name": homework["homework_name"],
+        "messages": bot.parse_status(homework),
+    }
+    return {"homework": meta, "prev_report": report}
+
+
+def shared(homework, interner):
+    meta = intern_homework(homework, interner)
+    return {"homework": meta, "prev_report": bot.homework_report(meta)}
+
+
+def measure(build):
+    raw = list(payloads())
+    tracemalloc.start()
+    states = [build(json.loads(text)) for text in raw]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del states
+    return size
+
+
+def main():
+    interner = Interner()
+    without = measure(plain)
+    with_interning = measure(lambda homework: shared(homework, interner))
+    print(f"Без общих строк:  {without / 2**20:7.1f} МиБ")
+    print(f"С общими строками: {with_interning / 2**20:7.1f} МиБ")
+    print(f"Экономия: {100 * (1 - with_interning / without):.0f}%, "
+          f"строк в таблице: {len(interner)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Проверка ответа с длинной историей домашних работ, как в цикле опроса:
+обычный путь (check_response + parse_status(homeworks[0])) против
+быстрого (validate_response_result + parse_status_result). Для
+сравнения — полная проверка всей истории по схеме.
+
+Запуск из корня репозитория: python benchmarks/bench_schema.py
+"""
+import os
+import sys
+import timeit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault("PRACTICUM_TOKEN", "benchmark")
+
+import homework  # noqa: E402
+from schema import validate_response  # noqa: E402
+
+HISTORY = 5000
+REPEAT = 20
+
+
+def make_payload(size):
+    statuses = list(homework.HOMEWORK_VERDICTS)
+    return {
+        "homeworks": [
+            {
+                "id": index,
+                "status": statuses[index % len(statuses)],
+                "homework_name": f"student__hw{index % 12:02}.zip",
+                "lesson_name": f"Спринт {index % 12}",
+                "reviewer_comment": "Всё хорошо",
+                "date_updated": "2023-03-27T14:07:38Z",
+            }
+            for index in range(size)
+        ],
+        "current_date": 1680000000,
+    }
+
+
+def slow_path(payload):
+    homeworks = homework.check_response(payload)
+    return homework.parse_status(homeworks[0])
+
+
+def fast_path(payload):
+    homeworks = homework.validate_response_result(payload).unwrap()
+    return homework.parse_status_result(homeworks[0]).unwrap()
+
+
+def main():
+    payload = make_payload(HISTORY)
+    homework.logging.disable(homework.logging.CRITICAL)
+    for name, func in (
+        ("check_response + parse_status", slow_path),
+        ("validate_response_result", fast_path),
+        ("validate_response, вся история", validate_response),
+    ):
+        seconds = min(
+            timeit.repeat(lambda: func(payload), number=1, repeat=REPEAT)
+        )
+        print(f"{name:32} {HISTORY} работ: {seconds * 1000:8.3f} мс")
+
+
+if __name__ == "__main__":
+    main()
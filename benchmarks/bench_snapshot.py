@@ -0,0 +1,44 @@
+"""
+Время старта со снимком состояния при разном числе подписчиков:
+открытие снимка и первое обращение к записи.
+
+Запуск из корня репозитория: python benchmarks/bench_snapshot.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from snapshot import SnapshotState, write_snapshot  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000, 500_000)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            path = os.path.join(directory, f"{size}.snap")
+            value = json.dumps({
+                "fromdate": 1680000000,
+                "prev_report": {
+                    "name": "student__hw05_final.zip",
+                    "messages": "Изменился статус проверки работы.",
+                },
+            }, ensure_ascii=False).encode()
+            write_snapshot(
+                path, ((f"token{i}", value) for i in range(size))
+            )
+            started = time.perf_counter()
+            state = SnapshotState(path)
+            state[f"token{size // 2}"]
+            elapsed = time.perf_counter() - started
+            print(f"{size:>8} подписчиков: старт {elapsed * 1000:6.2f} мс")
+            del state
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Часы цикла опроса: настоящие и виртуальные для симуляции."""
+import time
+
+
+class SystemClock:
+    """
+    Настоящее время. Функции модуля `time` ищутся при каждом вызове,
+    поэтому их подмена в тестах продолжает работать.
+    """
+
+    def time(self):
+        """Текущее время, секунды с начала эпохи."""
+        return time.time()
+
+    def monotonic(self):
+        """Монотонные часы для измерения интервалов."""
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        """Ждёт `seconds` секунд."""
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Виртуальное время: `sleep()` не ждёт, а сдвигает часы. Сутки
+    опроса проходят за доли секунды и всегда одинаково.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = float(start)
+        self.slept = 0.0
+
+    def time(self):
+        """Текущее виртуальное время."""
+        return self.now
+
+    def monotonic(self):
+        """Виртуальное время не идёт назад, поэтому годится и здесь."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Сдвигает часы на `seconds` секунд."""
+        if seconds > 0:
+            self.now += seconds
+            self.slept += seconds
+
+    def advance_to(self, moment):
+        """Переводит часы на `moment`, если он ещё не наступил."""
+        self.sleep(moment - self.now)
@@ -0,0 +1,133 @@
+"""Сводки: несколько изменений статуса в одном сообщении чату."""
+import logging
+import threading
+import time
+
+from telegram.constants import MAX_MESSAGE_LENGTH
+
+from notifiers import unaccepted
+
+DIGEST_TITLE = "Сводка изменений статусов ({count}):"
+
+
+def split_message(lines, limit=MAX_MESSAGE_LENGTH):
+    """
+    Собирает строки в сообщения не длиннее `limit`, не разрывая
+    строки; слишком длинная строка режется по `limit`.
+    """
+    return [text for text, _ in split_lines(lines, limit)]
+
+
+def split_lines(lines, limit=MAX_MESSAGE_LENGTH):
+    """
+    Как split_message, но для каждого сообщения возвращает и число
+    строк, целиком отправленных к его концу: [(текст, строк), ...].
+    """
+    chunks = []
+    current = ""
+    done = 0
+    for line in lines:
+        while len(line) > limit:
+            if current:
+                chunks.append((current, done))
+                current = ""
+            chunks.append((line[:limit], done))
+            line = line[limit:]
+        candidate = current + "\n" + line if current else line
+        if len(candidate) > limit:
+            chunks.append((current, done))
+            candidate = line
+        current = candidate
+        done += 1
+    if current:
+        chunks.append((current, done))
+    return chunks
+
+
+def merge_channels(first, second):
+    """Каналы из обоих наборов, без повторов и в порядке появления."""
+    return tuple(dict.fromkeys(first + tuple(second)))
+
+
+class Digest:
+    """
+    Копит сообщения по чатам и раз в `window` секунд отправляет
+    каждому чату одну сводку (несколько, если не влезает в лимит)
+    по каналам, указанным для чата при добавлении.
+    """
+
+    def __init__(self, window, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._pending = {}
+        self._opened = {}
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def add(self, chat_id, message, channels=("telegram",)):
+        """
+        Откладывает сообщение для чата; всегда возвращает True.
+        Каналы чата объединяются со всех add() в пределах окна.
+        """
+        with self._lock:
+            if chat_id not in self._pending:
+                self._pending[chat_id] = []
+                self._opened[chat_id] = self.clock()
+                self._channels[chat_id] = ()
+            self._pending[chat_id].append(message)
+            self._channels[chat_id] = merge_channels(
+                self._channels[chat_id], channels
+            )
+        return True
+
+    def pending(self):
+        """Число отложенных сообщений во всех чатах."""
+        with self._lock:
+            return sum(len(messages) for messages in self._pending.values())
+
+    def flush(self, send, force=False):
+        """
+        Отправляет сводки чатам, у которых истекло окно (или всем при
+        `force`) через send(channels, chat_id, text), который
+        возвращает принявшие каналы (или bool). Не принятое каким-либо
+        каналом остаётся до следующего раза для этих каналов.
+        """
+        now = self.clock()
+        with self._lock:
+            due = [
+                chat_id for chat_id, opened in self._opened.items()
+                if force or now - opened >= self.window
+            ]
+            batches = {
+                chat_id: (self._pending.pop(chat_id),
+                          self._channels.pop(chat_id))
+                for chat_id in due
+            }
+            for chat_id in due:
+                del self._opened[chat_id]
+        for chat_id, (messages, channels) in batches.items():
+            lines = [DIGEST_TITLE.format(count=len(messages))]
+            lines.extend("• " + message for message in messages)
+            sent_lines = 0
+            for text, done in split_lines(lines):
+                left = unaccepted(channels, send(channels, chat_id, text))
+                if left:
+                    logging.error(
+                        f"Сводка для чата {chat_id} не отправлена "
+                        f"в {', '.join(left)}."
+                    )
+                    # первая строка — заголовок, остальные — сообщения
+                    self._requeue(
+                        chat_id,
+                        messages[max(0, sent_lines - 1):max(0, done - 1)],
+                        left,
+                    )
+                sent_lines = done
+
+    def _requeue(self, chat_id, rest, channels):
+        with self._lock:
+            self._pending[chat_id] = rest + self._pending.get(chat_id, [])
+            self._opened.setdefault(chat_id, self.clock())
+            self._channels[chat_id] = merge_channels(
+                channels, self._channels.get(chat_id, ())
+            )
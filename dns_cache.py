@@ -0,0 +1,92 @@
+"""Кэш DNS для хостов бота и его прогрев при старте."""
+import logging
+import socket
+import threading
+import time
+
+SYSTEM_GETADDRINFO = socket.getaddrinfo
+
+
+def system_resolve(host, port, family=0, type=0, proto=0, flags=0):
+    """
+    Системный резолвер. TTL он не сообщает, поэтому возвращает None —
+    кэш подставит свой TTL по умолчанию.
+    """
+    return SYSTEM_GETADDRINFO(host, port, family, type, proto, flags), None
+
+
+class DnsCache:
+    """
+    Кэширует socket.getaddrinfo для хостов `hosts`.
+
+    `resolve(host, port, family, type, proto, flags)` возвращает
+    (результат getaddrinfo, ttl или None); запись живёт ttl секунд,
+    а при None — `ttl` по умолчанию. Если резолвер упал, отдаётся
+    устаревшая запись, пока она есть. Прочие хосты не кэшируются.
+    """
+
+    def __init__(self, hosts, ttl=300, resolve=system_resolve,
+                 clock=time.monotonic):
+        self.hosts = set(hosts)
+        self.ttl = ttl
+        self.resolve = resolve
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._installed = False
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """Замена socket.getaddrinfo с кэшем."""
+        if host not in self.hosts:
+            return SYSTEM_GETADDRINFO(host, port, family, type, proto, flags)
+        key = (host, port, family, type, proto, flags)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        try:
+            result, ttl = self.resolve(host, port, family, type, proto, flags)
+        except OSError as error:
+            if entry is None:
+                raise
+            with self._lock:
+                self.stale += 1
+            logging.warning(
+                f"DNS для {host} недоступен ({error}), берём старый адрес."
+            )
+            return entry[0]
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (result, expires)
+        return result
+
+    def install(self):
+        """Подменяет socket.getaddrinfo кэширующей версией."""
+        socket.getaddrinfo = self.getaddrinfo
+        self._installed = True
+
+    def uninstall(self):
+        """Возвращает системный socket.getaddrinfo."""
+        if self._installed:
+            socket.getaddrinfo = SYSTEM_GETADDRINFO
+            self._installed = False
+
+    def prewarm(self, port=443):
+        """
+        Заранее разрешает все хосты, чтобы первый опрос не ждал DNS.
+        Соединения не открываются: requests.get не держит пул между
+        вызовами, и открытое здесь соединение никто бы не использовал.
+        Ошибки только логируются.
+        """
+        for host in self.hosts:
+            try:
+                self.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+                logging.info(f"Адрес {host} разрешён заранее.")
+            except OSError as error:
+                logging.warning(f"Не удалось разрешить {host}: {error}")
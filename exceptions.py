@@ -7,4 +7,20 @@ class Not200Response(Exception):
 class EmptyAnswerAPI(Exception):
     """Объявление нового класса для исключений в check_response."""
 
-    pass
\ No newline at end of file
+    pass
+
+
+class ShutdownRequested(BaseException):
+    """Запрошена остановка бота сигналом SIGTERM/SIGINT.
+
+    Наследуется от BaseException, чтобы его не перехватывал
+    общий `except Exception` в цикле опроса.
+    """
+
+    pass
+
+
+class StageTimeout(Exception):
+    """Стадия цикла опроса зависла и прервана сторожем."""
+
+    pass
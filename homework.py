@@ -1,13 +1,48 @@
+import json
 import logging
 import os
 import sys
-import time
+from contextlib import nullcontext
+from functools import partial
 from http import HTTPStatus
+from urllib.parse import urlparse
 
 import requests
 import telegram
 from dotenv import load_dotenv
-from exceptions import Not200Response, EmptyAnswerAPI
+from batch import BatchFetcher
+from clock import SystemClock
+from digest import Digest
+from dns_cache import DnsCache
+from exceptions import EmptyAnswerAPI, ShutdownRequested, StageTimeout
+from interning import INTERN, intern_homework
+from notifiers import (
+    FanOut,
+    FileNotifier,
+    TelegramNotifier,
+    WebhookNotifier,
+    unaccepted,
+)
+from profiling import Profiler
+from recording import Recorder
+from results import (
+    NO_HOMEWORKS,
+    NO_NAME,
+    NOT_DICT,
+    NOT_LIST,
+    UNKNOWN_STATUS,
+    Err,
+    Ok,
+)
+from scheduler import PollScheduler
+from schema import MISSING, validate_response
+from shutdown import Lifecycle
+from snapshot import SnapshotState
+from state_store import StateStore
+from subscribers import SubscriptionIndex, load_subscribers
+from tg_client import TelegramClients
+from tracing import Tracer, TraceIdFilter
+from watchdog import HealthServer, Watchdog
 
 
 load_dotenv()
@@ -25,6 +60,61 @@ HOMEWORK_VERDICTS = {
     "reviewing": "Работа взята на проверку ревьюером.",
     "rejected": "Работа проверена: у ревьюера есть замечания.",
 }
+FAILURE_PREFIX = "Сбой в работе программы: "
+
+SHUTDOWN_TIMEOUT = int(os.getenv("SHUTDOWN_TIMEOUT", 30))
+CONNECT_TIMEOUT = float(os.getenv("CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("READ_TIMEOUT", 30))
+STAGE_DEADLINE = int(os.getenv("STAGE_DEADLINE", 120))
+HEALTH_PORT = os.getenv("HEALTH_PORT")
+DNS_TTL = int(os.getenv("DNS_TTL", 300))
+WARM_UP = bool(os.getenv("WARM_UP"))
+TELEGRAM_API_HOST = "api.telegram.org"
+STATE_FILE = os.getenv("STATE_FILE")
+VERDICTS_FILE = os.getenv("VERDICTS_FILE")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+SUBSCRIBERS_FILE = os.getenv("SUBSCRIBERS_FILE")
+SUBSCRIPTIONS = SubscriptionIndex()
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", 8))
+FAST_PATH = os.getenv("FAST_PATH", "").lower() in ("1", "true", "yes")
+COLD_STATE_FILE = os.getenv("COLD_STATE_FILE")
+STATE_MAX_RESIDENT = os.getenv("STATE_MAX_RESIDENT")
+STATE_MAX_RSS_MB = os.getenv("STATE_MAX_RSS_MB")
+DIGEST_WINDOW = int(os.getenv("DIGEST_WINDOW", 3600))
+DIGEST = Digest(DIGEST_WINDOW)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+NOTIFY_FILE = os.getenv("NOTIFY_FILE")
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", 1000))
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", 4))
+NOTIFY_KEEP_HISTORY = bool(os.getenv("NOTIFY_KEEP_HISTORY"))
+NOTIFY_RETRIES = int(os.getenv("NOTIFY_RETRIES", 10))
+TELEGRAM_POOL_SIZE = int(
+    os.getenv("TELEGRAM_POOL_SIZE", NOTIFY_WORKERS + 4)
+)
+TELEGRAM_CLIENTS = TelegramClients(
+    TELEGRAM_POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT
+)
+POLL_CAPACITY = int(os.getenv("POLL_CAPACITY", 0))
+NOTIFY_SLO = int(os.getenv("NOTIFY_SLO", RETRY_PERIOD))
+IDLE_POLL_PERIOD = int(os.getenv("IDLE_POLL_PERIOD", RETRY_PERIOD))
+SCHEDULER = PollScheduler(
+    NOTIFY_SLO,
+    RETRY_PERIOD,
+    IDLE_POLL_PERIOD,
+    capacity=POLL_CAPACITY or None,
+)
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE")
+SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", 300))
+RECORD_FILE = os.getenv("RECORD_FILE")
+RECORDER = Recorder(RECORD_FILE) if RECORD_FILE else None
+CLOCK = SystemClock()
+# запись состояния с сообщениями, не доставленными к остановке
+UNDELIVERED_KEY = "__undelivered__"
+
+TRACER = Tracer(
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", 0)),
+    export_path=os.getenv("TRACE_FILE"),
+)
 
 
 def check_tokens():
@@ -47,9 +137,14 @@ def check_tokens():
 
 def send_message(bot: telegram.bot.Bot, message):
     """Отправление сообщения в Telegram бот."""
+    return send_message_to(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_message_to(bot: telegram.bot.Bot, chat_id, message):
+    """Отправление сообщения в заданный чат Telegram."""
     logging.info("Старт отправки сообщения: " + message)
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        bot.send_message(chat_id, message, timeout=READ_TIMEOUT)
         logging.debug("Сообщение отправлено, текст: " + message)
         return True
     except telegram.error.TelegramError as error:
@@ -63,116 +158,705 @@ def get_api_answer(fromdate):
     Получает ответ от API на запрос json домашних работы.
     Проверяет наличие ответа и ожидаемые ключи в API.
     """
-    params_api = {
-        "url": ENDPOINT,
-        "headers": HEADERS,
-        "params": {"from_date": fromdate},
-    }
+    return request_homeworks(HEADERS, fromdate)
+
+
+def get_api_answer_for(token, fromdate):
+    """Запрос к API от имени подписчика с токеном `token`."""
+    return request_homeworks({"Authorization": "OAuth " + token}, fromdate)
+
+
+def request_homeworks(headers, fromdate):
+    """Выполняет GET-запрос к API домашних работ."""
+    result = request_homeworks_result(headers, fromdate)
+    if not result.ok:
+        raise ConnectionError(
+            "Ошибка: "
+            + str(result.detail)
+            + "{} {} {}".format(
+                ENDPOINT, masked_headers(headers), {"from_date": fromdate}
+            )
+        )
+    return result.value
+
+
+def masked_headers(headers):
+    """Заголовки для логов и текстов ошибок: токен скрыт."""
+    if "Authorization" not in headers:
+        return headers
+    return {**headers, "Authorization": "OAuth ***"}
+
+
+def get_api_answer_result(fromdate):
+    """Как get_api_answer, но возвращает Ok/Err вместо исключений."""
+    return request_homeworks_result(HEADERS, fromdate)
+
+
+def get_api_answer_for_result(token, fromdate):
+    """Как get_api_answer_for, но возвращает Ok/Err вместо исключений."""
+    return request_homeworks_result(
+        {"Authorization": "OAuth " + token}, fromdate
+    )
+
+
+def request_homeworks_result(headers, fromdate):
+    """GET-запрос к API домашних работ, результат — Ok(dict) или Err."""
     logging.info(
-        "Начало отправки запроса API. Параметры: "
-        + "{url} {headers} {params}".format(**params_api)
+        "Начало отправки запроса API. Параметры: %s %s %s",
+        ENDPOINT,
+        masked_headers(headers),
+        {"from_date": fromdate},
     )
     try:
-        response = requests.get(**params_api)
-        logging.info("Запрос GET API выполнен.")
-        if response.status_code != HTTPStatus.OK:
-            error_message = "Ответ сервера не 200, a {}".format(
-                response.status_code
-            )
-            raise Not200Response(error_message)
-        return response.json()
+        response = requests.get(
+            url=ENDPOINT,
+            headers=headers,
+            params={"from_date": fromdate},
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+        )
     except Exception as error:
-        raise ConnectionError(
-            "Ошибка: "
-            + str(error)
-            + "{url} {headers} {params}".format(**params_api)
+        return Err("request", str(error))
+    logging.info("Запрос GET API выполнен.")
+    if response.status_code != HTTPStatus.OK:
+        return Err(
+            "not_200", f"Ответ сервера не 200, a {response.status_code}"
         )
+    try:
+        return Ok(response.json())
+    except ValueError as error:
+        return Err("invalid_json", str(error))
 
 
 def check_response(response):
     """Проверяем ответ API на соответствие."""
     logging.info("Начало проверки check_response ответа от API.")
+    return check_response_result(response).unwrap()
+
+
+def check_response_result(response):
+    """Как check_response, но возвращает Ok(homeworks) или Err."""
     if not isinstance(response, dict):
-        raise TypeError("Ответ API не является словарем")  # требование тестов!
+        return NOT_DICT  # требование тестов!
     if "homeworks" not in response:
-        raise EmptyAnswerAPI("Ответ API не содержит ключа 'homeworks'")
-    response = response.get("homeworks")
-    if not isinstance(response, list):
-        raise TypeError("API под ключом `homeworks` приходят не в виде списка")
-    return response
+        return NO_HOMEWORKS
+    homeworks = response["homeworks"]
+    if not isinstance(homeworks, list):
+        return NOT_LIST
+    return Ok(homeworks)
+
+
+def validate_response_result(response):
+    """
+    Проверяет ответ по схеме из schema.py за один проход. Из истории
+    работ проверяется только последняя — о ней и сообщает опрос, как
+    check_response + parse_status(homeworks[0]). Возвращает
+    Ok([нормализованная работа]) или Err со всеми ошибками полей.
+    """
+    value, errors = validate_response(response, limit=1)
+    if not errors:
+        return Ok(value["homeworks"])
+    first = errors[0]
+    if first.path == "":
+        return NOT_DICT
+    if first.path == "homeworks":
+        return NO_HOMEWORKS if first.problem == MISSING else NOT_LIST
+    return Err("invalid_schema", "; ".join(map(str, errors)))
 
 
 def parse_status(homework):
     """Извлекает инфо о статусе homework и в случае успеха возвращает."""
+    return parse_status_result(homework).unwrap()
+
+
+def parse_status_result(homework):
+    """Как parse_status, но возвращает Ok(сообщение) или Err."""
     homework_status = homework.get("status")
     homework_name = homework.get("homework_name")
     if homework_status not in HOMEWORK_VERDICTS:
-        raise ValueError("homework_status нет в HOMEWORK_VERDICTS")
+        return UNKNOWN_STATUS
     if homework_name is None:  # для прохождения тестов!
-        raise KeyError("homework_name отсутствует")
+        return NO_NAME
     verdict = HOMEWORK_VERDICTS[homework_status]
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    return Ok(f'Изменился статус проверки работы "{homework_name}". {verdict}')
+
+
+def load_subscriptions():
+    """
+    Перечитывает SUBSCRIBERS_FILE в индекс SUBSCRIPTIONS. Каналы,
+    которые не настроены, у подписчиков убираются: иначе сообщение
+    для них никогда не считалось бы доставленным.
+    """
+    configured = configured_channels()
+    subscribers = []
+    for subscriber in load_subscribers(SUBSCRIBERS_FILE):
+        channels = tuple(
+            channel for channel in subscriber.channels
+            if channel in configured
+        )
+        if channels != subscriber.channels:
+            logging.warning(
+                f"Чат {subscriber.chat_id}: каналы "
+                f"{set(subscriber.channels) - set(channels)} не настроены."
+            )
+        subscribers.append(subscriber._replace(channels=channels))
+    SUBSCRIPTIONS.load(subscribers)
+    logging.info(
+        f"Подписок: {len(SUBSCRIPTIONS)}, "
+        f"токенов: {len(SUBSCRIPTIONS.by_token)}, "
+        f"чатов: {len(SUBSCRIPTIONS.by_chat)}."
+    )
+
+
+def reload_settings():
+    """
+    Перечитывает .env и шаблоны вердиктов без перезапуска бота.
+    TELEGRAM_TOKEN применяется только после перезапуска.
+    """
+    global PRACTICUM_TOKEN, TELEGRAM_CHAT_ID
+    load_dotenv(override=True)
+    PRACTICUM_TOKEN = os.getenv("PRACTICUM_TOKEN", PRACTICUM_TOKEN)
+    TELEGRAM_CHAT_ID = os.getenv("CHAT_ID", TELEGRAM_CHAT_ID)
+    HEADERS["Authorization"] = "OAuth " + PRACTICUM_TOKEN
+    if os.getenv("TELEGRAM_TOKEN") != TELEGRAM_TOKEN:
+        logging.warning("TELEGRAM_TOKEN изменится после перезапуска.")
+    if VERDICTS_FILE:
+        with open(VERDICTS_FILE, encoding="UTF-8") as file:
+            verdicts = json.load(file)
+        if not isinstance(verdicts, dict):
+            raise TypeError("Файл вердиктов должен содержать словарь")
+        HOMEWORK_VERDICTS.clear()
+        HOMEWORK_VERDICTS.update(verdicts)
+    if SUBSCRIBERS_FILE:
+        load_subscriptions()
+    logging.info("Настройки перезагружены.")
+
+
+def new_state(fromdate):
+    """Начальное состояние опроса одного подписчика."""
+    return {
+        "fromdate": fromdate,
+        "prev_report": {"name": None, "messages": None},
+        "homework": None,
+    }
+
+
+def load_state(state):
+    """Дополняет `state` сохранённым при остановке состоянием."""
+    if not STATE_FILE or not os.path.exists(STATE_FILE):
+        return state
+    try:
+        with open(STATE_FILE, encoding="UTF-8") as file:
+            state.update(json.load(file))
+        logging.info("Состояние восстановлено из " + STATE_FILE)
+    except (OSError, ValueError) as error:
+        logging.error("Не удалось прочитать состояние: " + str(error))
+    return state
+
+
+def save_state(state):
+    """Атомарно сохраняет состояние бота в STATE_FILE."""
+    if not STATE_FILE:
+        return
+    tmp_path = STATE_FILE + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="UTF-8") as file:
+            json.dump(dict(state), file, ensure_ascii=False)
+        os.replace(tmp_path, STATE_FILE)
+        logging.info("Состояние сохранено в " + STATE_FILE)
+    except OSError as error:
+        logging.error("Не удалось сохранить состояние: " + str(error))
+
+
+def check_homeworks(bot, state):
+    """Один цикл опроса: запрос к API, проверка ответа, отправка."""
+    notify = TRACER.wrap(partial(send_message, bot), "send_message")
+    fetch = TRACER.wrap(
+        get_api_answer_result if FAST_PATH else get_api_answer,
+        "get_api_answer",
+    )
+    if RECORDER:
+        notify = RECORDER.notify(TELEGRAM_CHAT_ID, notify)
+        fetch = RECORDER.fetch(PRACTICUM_TOKEN, fetch)
+    poll = poll_homeworks_fast if FAST_PATH else poll_homeworks
+    return poll(fetch, notify, state)
+
+
+def check_subscribers(fanout, fetcher, state, watchdog=None):
+    """
+    Один цикл опроса подписок из SUBSCRIPTIONS: каждый токен
+    запрашивается один раз, сколько бы чатов за ним ни следило.
+    Кого и в каком порядке опрашивать, решает SCHEDULER.
+
+    Цикл может быть сколь угодно длинным, поэтому срок STAGE_DEADLINE
+    сторожа `watchdog` действует на обработку ответа каждого токена
+    отдельно: зависший токен прерывается, остальные опрашиваются.
+    """
+    now = int(CLOCK.time())
+    # состояние читается только у выбранных: остальные могут лежать
+    # на диске или в снимке неразобранными
+    due = [
+        (
+            SUBSCRIPTIONS.followers(token)[0],
+            state.setdefault(token, new_state(now)),
+        )
+        for token in SCHEDULER.select(SUBSCRIPTIONS.by_token, now)
+    ]
+    results = fetcher.fetch(
+        (subscriber, sub_state["fromdate"]) for subscriber, sub_state in due
+    )
+    poll = poll_homeworks_fast if FAST_PATH else poll_homeworks
+    for result in results:
+        token = result.subscriber.token
+        before = state[token]
+        delivered = dict(before.get("delivered") or {})
+        notify = partial(
+            notify_followers,
+            fanout,
+            SUBSCRIPTIONS.followers(token),
+            result.response,
+            delivered,
+        )
+        stage = watchdog.stage("poll", cancel=True) if watchdog else (
+            nullcontext()
+        )
+        try:
+            with stage:
+                after = poll(result.unwrap, notify, before)
+        except StageTimeout as error:
+            logging.error(str(error))
+            continue
+        after = with_delivered(after, delivered)
+        if after != before:
+            # запись помечает подписчика изменённым для снимка
+            state[token] = after
+        SCHEDULER.observe(token, before, after, CLOCK.time())
+    DIGEST.flush(fanout.deliver)
+    if isinstance(state, SnapshotState):
+        state.checkpoint()
+    if not isinstance(state, dict):
+        logging.debug(f"Состояние подписчиков: {state.stats()}")
+    return state
+
+
+def notify_followers(fanout, followers, response, delivered, message):
+    """
+    Отправляет сообщение во все чаты, следящие за токеном, по всем
+    их каналам. True, только если его приняли все каналы всех чатов.
+    Принявшие каналы отмечаются в `delivered` (чат -> [сообщение,
+    каналы]), и при повторе в следующем цикле сообщение уходит
+    только в остальные. Сообщения о сбоях уходят без ключа и не
+    вытесняют из очереди ещё не отправленный вердикт; получают их
+    только личные чаты, следящие за одним этим токеном, а не чаты
+    когорты.
+    """
+    sent = True
+    failure = message.startswith(FAILURE_PREFIX)
+    for subscriber in followers:
+        chat_id = subscriber.chat_id
+        if failure and len(SUBSCRIPTIONS.tokens_for(chat_id)) > 1:
+            continue
+        done = delivered.get(chat_id)
+        done = done[1] if done and done[0] == message else []
+        channels = tuple(
+            channel for channel in subscriber.channels if channel not in done
+        )
+        if not channels:
+            continue
+        if subscriber.digest:
+            notify = partial(DIGEST.add, chat_id, channels=channels)
+        else:
+            notify = partial(
+                fanout.deliver,
+                channels,
+                chat_id,
+                key=None if failure else pending_key(chat_id, response),
+            )
+        if RECORDER:
+            notify = RECORDER.notify(chat_id, notify)
+        left = unaccepted(channels, notify(message))
+        if left:
+            sent = False
+        done = [channel for channel in subscriber.channels
+                if channel in done or channel not in left]
+        delivered[chat_id] = [message, done]
+    if sent:
+        delivered.clear()
+    return sent
+
+
+def follower_chats(token):
+    """Чаты, следящие за токеном."""
+    return [follower.chat_id for follower in SUBSCRIPTIONS.followers(token)]
+
+
+def keep_undelivered(state, undelivered):
+    """
+    Сохраняет в состоянии сообщения (канал, чат, текст), которые не
+    успели уйти до остановки, чтобы отправить их после перезапуска.
+    """
+    if undelivered:
+        state[UNDELIVERED_KEY] = {
+            "messages": [list(item) for item in undelivered]
+        }
+
+
+def redeliver(fanout, state):
+    """Ставит в очереди сообщения, не доставленные до прошлой остановки."""
+    if UNDELIVERED_KEY not in state:
+        return
+    messages = state.pop(UNDELIVERED_KEY)["messages"]
+    for channel, chat_id, message in messages:
+        fanout.submit(channel, chat_id, message)
+    logging.info(f"Повторно отправляется сообщений: {len(messages)}.")
+
+
+def with_delivered(state, delivered):
+    """Состояние с отметками о каналах, уже принявших сообщение."""
+    if delivered:
+        return {**state, "delivered": delivered}
+    if "delivered" in state:
+        state = dict(state)
+        del state["delivered"]
+    return state
+
+
+def pending_key(chat_id, response):
+    """
+    Ключ (чат, id работы) для уведомления по ответу API: новый статус
+    работы заменяет в очереди ещё не отправленный старый.
+    """
+    if isinstance(response, Ok):
+        response = response.value
+    try:
+        return chat_id, response["homeworks"][0]["id"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def configured_channels():
+    """Имена каналов доставки, настроенных в окружении."""
+    channels = {"telegram"}
+    if WEBHOOK_URL:
+        channels.add("webhook")
+    if NOTIFY_FILE:
+        channels.add("file")
+    return channels
+
+
+def make_fanout(bot, watchdog):
+    """Каналы доставки: Telegram и, если настроены, вебхук и файл."""
+    notifiers = [TelegramNotifier(partial(send_message_to, bot))]
+    if WEBHOOK_URL:
+        notifiers.append(
+            WebhookNotifier(WEBHOOK_URL, (CONNECT_TIMEOUT, READ_TIMEOUT))
+        )
+    if NOTIFY_FILE:
+        notifiers.append(FileNotifier(NOTIFY_FILE))
+    return FanOut(
+        notifiers,
+        NOTIFY_QUEUE_SIZE,
+        NOTIFY_WORKERS,
+        watchdog,
+        keep_history=NOTIFY_KEEP_HISTORY,
+        tracer=TRACER,
+        retries=NOTIFY_RETRIES,
+    )
+
+
+def warm_up(bot):
+    """
+    Включает кэш DNS для API Практикума и Telegram. С WARM_UP ещё и
+    разрешает оба хоста заранее, а соединение с Telegram прогревает
+    через getMe в пуле бота. Для Практикума греется только DNS:
+    requests.get открывает новое соединение на каждый запрос.
+    """
+    dns = DnsCache((urlparse(ENDPOINT).hostname, TELEGRAM_API_HOST), DNS_TTL)
+    dns.install()
+    if not WARM_UP:
+        return dns
+    dns.prewarm()
+    try:
+        # соединение остаётся в пуле бота и переиспользуется при отправке
+        bot.get_me(timeout=READ_TIMEOUT)
+    except Exception as error:
+        logging.warning("Не удалось прогреть Telegram: " + str(error))
+    return dns
+
+
+def start_health_server(watchdog, lifecycle, fanout):
+    """Запускает HTTP-проверки на HEALTH_PORT, если порт задан."""
+    if not HEALTH_PORT:
+        return None
+
+    def metrics():
+        return {
+            "telegram": TELEGRAM_CLIENTS.stats(),
+            "channels": fanout.stats() if fanout else {},
+            "scheduler": SCHEDULER.report(),
+        }
+
+    health = HealthServer(
+        watchdog,
+        int(HEALTH_PORT),
+        liveness_timeout=RETRY_PERIOD + 2 * STAGE_DEADLINE,
+        is_ready=lambda: not lifecycle.stopping,
+        metrics=metrics,
+    )
+    health.start()
+    logging.info(f"Проверки здоровья на порту {health.port}.")
+    return health
+
+
+def make_subscribers_state():
+    """
+    Хранилище состояний подписчиков: словарь или, если задан
+    COLD_STATE_FILE, StateStore с бюджетом памяти; с SNAPSHOT_FILE —
+    поверх снимка, который читается лениво при старте.
+    """
+    state = {}
+    if COLD_STATE_FILE:
+        state = StateStore(
+            COLD_STATE_FILE,
+            max_resident=(
+                int(STATE_MAX_RESIDENT) if STATE_MAX_RESIDENT else None
+            ),
+            max_rss=(
+                int(STATE_MAX_RSS_MB) * 2**20 if STATE_MAX_RSS_MB else None
+            ),
+        )
+    if SNAPSHOT_FILE:
+        state = SnapshotState(
+            SNAPSHOT_FILE, state, SNAPSHOT_INTERVAL, decode=decode_state
+        )
+    return state
+
+
+def decode_state(raw):
+    """Разбирает состояние подписчика из снимка, с общими строками."""
+    state = json.loads(raw)
+    if state.get("homework"):
+        state["homework"] = intern_homework(state["homework"])
+    if "prev_report" in state:
+        state["prev_report"] = upgrade_report(state["prev_report"])
+    return state
+
+
+def make_fetcher(watchdog):
+    """Пакетный опрос API для режима нескольких подписчиков."""
+    fetch_one = get_api_answer_for_result if FAST_PATH else get_api_answer_for
+    if RECORDER:
+        fetch_one = RECORDER.fetch_for(fetch_one, chats=follower_chats)
+    # запрос идёт в потоке пула: стадия трассы открывается там же
+    fetch_one = TRACER.wrap(fetch_one, "get_api_answer")
+    fetch_one = watchdog.watch(fetch_one, "fetch")
+    return BatchFetcher(fetch_one, max_in_flight=MAX_IN_FLIGHT)
+
+
+def poll_homeworks(fetch, notify, state):
+    """
+    Получает ответ через `fetch(fromdate)`, проверяет его
+    и при изменении статуса отправляет сообщение через `notify`.
+    Возвращает новое состояние подписчика.
+    """
+    prev_report = upgrade_report(state["prev_report"])
+    fromdate = state["fromdate"]
+    homework = state.get("homework")
+    current_report = {"name": None, "messages": None}
+    try:
+        response = fetch(fromdate)
+        with TRACER.span("check_response"):
+            homeworks = check_response(response)
+        if not homeworks:
+            current_report = {
+                "name": None,
+                "messages": "В homeworks пустой список",
+            }
+        else:
+            last_homework = homeworks[0]
+            with TRACER.span("parse_status"):
+                message = parse_status(last_homework)
+            homework = intern_homework(last_homework)
+            current_report = homework_report(homework)
+        if (
+            current_report != prev_report
+            and current_report["name"] is not None
+        ):
+            sent = notify(message)
+            if sent:
+                prev_report = current_report.copy()
+                fromdate = response.get("current_date", fromdate)
+        else:
+            logging.debug("Нет изменений в статусе дз. Ждём 10 мин.")
+    except EmptyAnswerAPI as error:
+        logging.error("пустой ответ от API " + str(error))
+    except Exception as error:
+        current_report = {
+            "name": None,
+            "messages": FAILURE_PREFIX + str(error),
+        }
+        logging.error(current_report["messages"])
+        if current_report != prev_report:
+            notify(current_report["messages"])
+            prev_report = current_report.copy()
+    return {
+        **state,
+        "fromdate": fromdate,
+        "prev_report": prev_report,
+        "homework": homework,
+    }
+
+
+def poll_homeworks_fast(fetch, notify, state):
+    """
+    То же, что poll_homeworks, но без исключений: `fetch(fromdate)`
+    и проверки возвращают Ok/Err.
+    """
+    prev_report = upgrade_report(state["prev_report"])
+    if prev_report is not state["prev_report"]:
+        state = {**state, "prev_report": prev_report}
+    fromdate = state["fromdate"]
+    result = fetch(fromdate)
+    if result.ok:
+        response = result.value
+        with TRACER.span("check_response"):
+            result = validate_response_result(response)
+    if result.ok and result.value:
+        last_homework = result.value[0]
+        with TRACER.span("parse_status"):
+            result = parse_status_result(last_homework)
+    if not result.ok:
+        return report_failure(notify, result, state)
+    if not result.value:
+        logging.debug("Нет изменений в статусе дз. Ждём 10 мин.")
+        return state
+    state = {**state, "homework": intern_homework(last_homework)}
+    current_report = homework_report(state["homework"])
+    if current_report == prev_report:
+        logging.debug("Нет изменений в статусе дз. Ждём 10 мин.")
+        return state
+    sent = notify(result.value)
+    if sent:
+        prev_report = current_report
+        fromdate = response.get("current_date", fromdate)
+    return {**state, "fromdate": fromdate, "prev_report": prev_report}
+
+
+def homework_report(homework):
+    """
+    Отчёт о последнем отправленном статусе работы: имя и общий объект
+    статуса вместо текста сообщения, который у каждого студента свой.
+    """
+    return {"name": homework["homework_name"], "status": homework["status"]}
+
+
+def upgrade_report(report):
+    """
+    Переводит отчёт старого вида {"name", "messages"} о работе в
+    {"name", "status"}: статус узнаётся по тексту вердикта в конце
+    сообщения. Отчёты о сбоях остаются с текстом.
+    """
+    if report.get("name") is None or "messages" not in report:
+        return report
+    message = report["messages"] or ""
+    for status, verdict in HOMEWORK_VERDICTS.items():
+        if message.endswith(verdict):
+            return {"name": report["name"], "status": INTERN(status)}
+    # шаблон вердикта сменился: статус отправят ещё раз
+    return {"name": report["name"], "status": None}
+
+
+def report_failure(notify, error, state):
+    """Сообщает об ошибке Err один раз, пока она не сменится другой."""
+    if error is NO_HOMEWORKS:
+        logging.error("пустой ответ от API " + error.detail)
+        return state
+    report = {
+        "name": None,
+        "messages": FAILURE_PREFIX + str(error.detail),
+    }
+    logging.error(report["messages"])
+    if report != state["prev_report"]:
+        notify(report["messages"])
+        state = {**state, "prev_report": report}
+    return state
 
 
 def main():
     """Основная логика работы бота."""
     check_tokens()
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    lifecycle = Lifecycle(SHUTDOWN_TIMEOUT, on_reload=reload_settings)
+    lifecycle.install()
+    profiler = Profiler(PROFILE_DIR)
+    profiler.install()
+    watchdog = Watchdog(STAGE_DEADLINE)
+    watchdog.start()
+    fetcher = make_fetcher(watchdog)
+    fanout = None
+    if SUBSCRIBERS_FILE:
+        load_subscriptions()
+        # потоки рассылки делят один бот с пулом на TELEGRAM_POOL_SIZE
+        bot = TELEGRAM_CLIENTS.get(TELEGRAM_TOKEN)
+        fanout = make_fanout(bot, watchdog)
+        poll = partial(check_subscribers, fanout, fetcher, watchdog=watchdog)
+        state = load_state(make_subscribers_state())
+        redeliver(fanout, state)
+    else:
+        poll = watchdog.watch(
+            partial(check_homeworks, bot), "poll", cancel=True
+        )
+        state = load_state(new_state(int(CLOCK.time())))
+    health = start_health_server(watchdog, lifecycle, fanout)
+    dns = warm_up(bot)
+    # паузы цикла идут через подменяемые часы CLOCK, а не модуль time
+    time = CLOCK
     logging.info("Бот запущен.")
-    current_report = {"name": None, "messages": None}
-    prev_report = {"name": None, "messages": None}
-    fromdate = int(time.time())
-    while True:
-        try:
-            response = get_api_answer(fromdate)
-            homeworks = check_response(response)
-            if not homeworks:
-                current_report = {
-                    "name": None,
-                    "messages": "В homeworks пустой список",
-                }
-            else:
-                last_homework = homeworks[0]
-                message = parse_status(last_homework)
-                current_report = {
-                    "name": last_homework.get("homework_name"),
-                    "messages": message,
-                }
-            if (
-                current_report != prev_report
-                and current_report["name"] is not None
-            ):
-                if send_message(bot, current_report["messages"]):
-                    prev_report = current_report.copy()
-                    fromdate = response.get("current_date", fromdate)
-            else:
-                logging.debug("Нет изменений в статусе дз. Ждём 10 мин.")
-        except EmptyAnswerAPI as error:
-            logging.error("пустой ответ от API " + str(error))
-        except Exception as error:
-            current_report["messages"] = "Сбой в работе программы: " + str(
-                error
-            )
-            logging.error(current_report["messages"])
-            if current_report != prev_report:
-                send_message(bot, current_report["messages"])
-                prev_report = current_report.copy()
-        finally:
-            time.sleep(RETRY_PERIOD)
+    try:
+        while not lifecycle.stopping:
+            try:
+                with TRACER.trace():
+                    state = poll(state)
+            except StageTimeout as error:
+                logging.error(str(error))
+            lifecycle.apply_pending_reload()
+            with lifecycle.idle():
+                time.sleep(RETRY_PERIOD)
+    except ShutdownRequested as reason:
+        logging.info("Бот остановлен: " + str(reason))
+    finally:
+        if health:
+            health.stop()
+        watchdog.stop()
+        dns.uninstall()
+        lifecycle.restore()
+        profiler.restore()
+        # один срок SHUTDOWN_TIMEOUT от сигнала на все шаги остановки
+        fetcher.close(lifecycle.time_left())
+        if fanout:
+            # состояние сохраняется после очередей: что не ушло,
+            # сохраняется вместе с ним
+            DIGEST.flush(fanout.deliver, force=True)
+            keep_undelivered(state, fanout.close(lifecycle.time_left()))
+        save_state(state)
+        if not isinstance(state, dict):
+            state.close()
 
 
 if __name__ == "__main__":
+    handlers = [
+        logging.FileHandler(
+            os.path.abspath(__file__ + ".log"), mode="a", encoding="UTF-8"
+        ),
+        logging.StreamHandler(stream=sys.stdout),
+    ]
+    for handler in handlers:
+        handler.addFilter(TraceIdFilter())
     logging.basicConfig(
         format=(
-            "%(asctime)s - %(name)s - %(funcName)s - %(lineno)d - "
-            "%(levelname)s - %(message)s"
+            "%(asctime)s - %(trace_id)s - %(name)s - %(funcName)s - "
+            "%(lineno)d - %(levelname)s - %(message)s"
         ),
         level=logging.DEBUG,
-        handlers=[
-            logging.FileHandler(
-                os.path.abspath(__file__ + ".log"), mode="a", encoding="UTF-8"
-            ),
-            logging.StreamHandler(stream=sys.stdout),
-        ],
+        handlers=handlers,
     )
     main()
@@ -0,0 +1,49 @@
+"""Общие экземпляры часто повторяющихся строк из ответов API."""
+import threading
+
+MAX_ENTRIES = 100_000
+HOMEWORK_FIELDS = ("status", "homework_name", "lesson_name")
+# имя файла работы начинается с логина студента — оно у всех разное
+SHARED_FIELDS = ("status", "lesson_name")
+
+
+class Interner:
+    """
+    Таблица канонических строк: равные строки заменяются одним
+    объектом. В отличие от sys.intern, размер таблицы ограничен
+    `max_entries` — сверх него строки возвращаются как есть.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._table = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, value):
+        if type(value) is not str:
+            return value
+        canonical = self._table.get(value)
+        if canonical is not None:
+            return canonical
+        with self._lock:
+            if len(self._table) >= self.max_entries:
+                return value
+            return self._table.setdefault(value, value)
+
+    def __len__(self):
+        return len(self._table)
+
+
+INTERN = Interner()
+
+
+def intern_homework(homework, intern=INTERN):
+    """
+    Краткие сведения о работе для состояния подписчика:
+    статус и урок — общими объектами, имя и дата — как есть.
+    """
+    meta = {field: homework.get(field) for field in HOMEWORK_FIELDS}
+    for field in SHARED_FIELDS:
+        meta[field] = intern(meta[field])
+    meta["date_updated"] = homework.get("date_updated")
+    return meta
@@ -0,0 +1,376 @@
+"""Каналы доставки уведомлений и параллельная рассылка по ним."""
+import heapq
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+
+import requests
+
+from tracing import attached, capture
+
+RETRY_ATTEMPTS = 10
+RETRY_DELAY = 1.0
+RETRY_MAX_DELAY = 300.0
+
+
+def unaccepted(channels, accepted):
+    """
+    Каналы из `channels`, не принявшие сообщение. `accepted` — ответ
+    отправки: принявшие каналы или просто True/False.
+    """
+    if accepted is True:
+        return ()
+    return tuple(channel for channel in channels
+                 if not accepted or channel not in accepted)
+
+
+class TelegramNotifier:
+    """Доставка в Telegram через send(chat_id, message) -> bool."""
+
+    name = "telegram"
+
+    def __init__(self, send):
+        self._send = send
+
+    def send(self, target, message):
+        """Отправляет сообщение в чат `target`."""
+        return self._send(target, message)
+
+
+class WebhookNotifier:
+    """POST {"target": ..., "text": ...} на заданный URL."""
+
+    name = "webhook"
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, target, message):
+        """Отправляет сообщение на вебхук."""
+        try:
+            response = requests.post(
+                self.url,
+                json={"target": target, "text": message},
+                timeout=self.timeout,
+            )
+        except requests.RequestException as error:
+            logging.error("Ошибка отправки на вебхук: " + str(error))
+            return False
+        if not response.ok:
+            logging.error(f"Вебхук ответил {response.status_code}")
+        return response.ok
+
+
+class FileNotifier:
+    """Дописывает сообщения в файл JSON Lines."""
+
+    name = "file"
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, target, message):
+        """Записывает сообщение в файл."""
+        line = json.dumps(
+            {"t": round(time.time(), 3), "target": target, "text": message},
+            ensure_ascii=False,
+        )
+        with self._lock:
+            try:
+                with open(self.path, "a", encoding="UTF-8") as file:
+                    file.write(line + "\n")
+            except OSError as error:
+                logging.error("Ошибка записи уведомления: " + str(error))
+                return False
+        return True
+
+
+class Channel:
+    """
+    Очередь на `queue_size` сообщений и `workers` потоков для одного
+    канала. Если очередь полна, новое сообщение отбрасывается —
+    медленный канал не задерживает опрос и другие каналы.
+    Если передан `watchdog`, каждая отправка — его стадия "send";
+    если `tracer` — стадия трассы "send_message". Отправка идёт
+    в трассе цикла, поставившего сообщение в очередь.
+
+    Сообщение с ключом `key` (например, чат и id работы) вытесняет
+    ещё не отправленное сообщение с тем же ключом: из очереди уйдёт
+    только последний статус. С `keep_history=True` отправляются все.
+
+    Неудачная отправка остаётся в канале и повторяется через
+    `retry_delay` секунд, с удвоением паузы (не больше RETRY_MAX_DELAY),
+    до `retries` попыток; ждущее повтора сообщение тоже вытесняется
+    более новым с тем же ключом. Что не успело уйти к сроку остановки,
+    считается отброшенным.
+    """
+
+    def __init__(self, notifier, queue_size=1000, workers=4, watchdog=None,
+                 keep_history=False, tracer=None, retries=RETRY_ATTEMPTS,
+                 retry_delay=RETRY_DELAY):
+        self.notifier = notifier
+        self.keep_history = keep_history
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._send = notifier.send
+        if tracer is not None:
+            self._send = tracer.wrap(self._send, "send_message")
+        if watchdog is not None:
+            self._send = watchdog.watch(self._send, "send")
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.superseded = 0
+        self.retried = 0
+        self._pending = {}
+        self._retry = []
+        self._sequence = itertools.count()
+        self._deadline = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers = [
+            threading.Thread(
+                target=self._work,
+                name=f"notify-{notifier.name}-{index}",
+                daemon=True,
+            )
+            for index in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, target, message, key=None):
+        """Ставит сообщение в очередь; False, если очередь полна."""
+        if key is None or self.keep_history:
+            return self._put((target, [message], None, capture(), 0))
+        with self._lock:
+            box = self._pending.get(key)
+            if box is not None:
+                box[0] = message
+                self.superseded += 1
+                return True
+            box = [message]
+            accepted = self._put((target, box, key, capture(), 0))
+            if accepted:
+                self._pending[key] = box
+            return accepted
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            logging.warning(
+                f"Очередь канала {self.notifier.name} переполнена, "
+                "сообщение отброшено."
+            )
+            return False
+        return True
+
+    def stats(self):
+        """Счётчики канала."""
+        return {
+            "queued": self._queue.qsize(),
+            "retrying": len(self._retry),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "superseded": self.superseded,
+            "retried": self.retried,
+        }
+
+    def close(self, timeout):
+        """Ждёт до `timeout` секунд, пока очередь разберут, и гасит потоки."""
+        deadline = time.monotonic() + timeout
+        self.stop(deadline)
+        return self.join(deadline)
+
+    def stop(self, deadline):
+        """
+        Просит потоки дослать очередь и повторы к моменту `deadline`
+        (по time.monotonic) и завершиться.
+        """
+        with self._lock:
+            self._deadline = deadline
+        for _ in self._workers:
+            self._wake()
+
+    def _wake(self):
+        """Будит поток, ждущий пустую очередь."""
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def join(self, deadline):
+        """
+        Ждёт потоки до `deadline`. Недоставленное считает отброшенным
+        и возвращает списком пар (адресат, сообщение).
+        """
+        for worker in self._workers:
+            worker.join(max(0, deadline - time.monotonic()))
+        with self._lock:
+            items = [item for _, _, item in sorted(self._retry)]
+            self._retry.clear()
+            self._pending.clear()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                items.append(item)
+        left = [(target, box[0]) for target, box, *_ in items]
+        if left:
+            self.dropped += len(left)
+            logging.error(
+                f"Канал {self.notifier.name}: при остановке "
+                f"не доставлено {len(left)} сообщений."
+            )
+        return left
+
+    def _next(self):
+        """
+        Следующее сообщение: созревший повтор или из очереди. None —
+        пора завершаться: после stop() всё разобрано или вышел срок.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                deadline = self._deadline
+                if self._retry and self._retry[0][0] <= now:
+                    if deadline is None or now < deadline:
+                        return heapq.heappop(self._retry)[2]
+                if deadline is not None and (
+                    now >= deadline
+                    or self._queue.empty()
+                    and (not self._retry or self._retry[0][0] >= deadline)
+                ):
+                    # будит следующий поток: метку мог забрать этот
+                    self._wake()
+                    return None
+                waits = [deadline - now] if deadline is not None else []
+                if self._retry:
+                    waits.append(self._retry[0][0] - now)
+                wait = min(waits) if waits else None
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                continue
+            if item is not None:
+                return item
+
+    def _work(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            target, box, key, context, attempt = item
+            if key is not None:
+                with self._lock:
+                    if self._pending.get(key) is box:
+                        del self._pending[key]
+            message = box[0]
+            try:
+                with attached(context):
+                    ok = self._send(target, message)
+            except Exception as error:
+                logging.error(
+                    f"Сбой канала {self.notifier.name}: {error}"
+                )
+                ok = False
+            if ok:
+                self.sent += 1
+            else:
+                self._schedule_retry(item)
+
+    def _schedule_retry(self, item):
+        target, box, key, context, attempt = item
+        attempt += 1
+        if attempt >= self.retries:
+            self.failed += 1
+            logging.error(
+                f"Сообщение для {target} в канал {self.notifier.name} "
+                f"не доставлено за {attempt} попыток."
+            )
+            return
+        delay = min(self.retry_delay * 2 ** (attempt - 1), RETRY_MAX_DELAY)
+        with self._lock:
+            if key is not None:
+                if key in self._pending:
+                    # пока шла отправка, пришёл более новый статус
+                    self.superseded += 1
+                    return
+                self._pending[key] = box
+            heapq.heappush(
+                self._retry,
+                (
+                    time.monotonic() + delay,
+                    next(self._sequence),
+                    (target, box, key, context, attempt),
+                ),
+            )
+        self.retried += 1
+
+
+class FanOut:
+    """Рассылает одно сообщение по всем каналам подписчика сразу."""
+
+    def __init__(self, notifiers, queue_size=1000, workers=4, watchdog=None,
+                 keep_history=False, tracer=None, retries=RETRY_ATTEMPTS):
+        self.channels = {
+            notifier.name: Channel(
+                notifier,
+                queue_size,
+                workers,
+                watchdog,
+                keep_history,
+                tracer,
+                retries,
+            )
+            for notifier in notifiers
+        }
+
+    def submit(self, channel, target, message, key=None):
+        """Отправляет сообщение в один канал."""
+        if channel not in self.channels:
+            logging.warning(f"Канал {channel} не настроен.")
+            return False
+        return self.channels[channel].submit(target, message, key)
+
+    def deliver(self, channels, target, message, key=None):
+        """
+        Ставит сообщение в очереди всех `channels` и возвращает кортеж
+        принявших его каналов (пустой — не принял никто). Сообщение
+        с ключом `key` заменяет неотправленное с тем же ключом.
+        """
+        return tuple(
+            channel for channel in channels
+            if self.submit(channel, target, message, key)
+        )
+
+    def stats(self):
+        """Счётчики всех каналов."""
+        return {
+            name: channel.stats() for name, channel in self.channels.items()
+        }
+
+    def close(self, timeout):
+        """
+        Дожидается доставки из очередей всех каналов, не дольше
+        `timeout` секунд на все вместе. Возвращает недоставленное:
+        тройки (канал, адресат, сообщение).
+        """
+        deadline = time.monotonic() + timeout
+        for channel in self.channels.values():
+            channel.stop(deadline)
+        return [
+            (name, target, message)
+            for name, channel in self.channels.items()
+            for target, message in channel.join(deadline)
+        ]
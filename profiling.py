@@ -0,0 +1,157 @@
+"""Профилирование работающего бота по сигналу, без перезапуска."""
+import cProfile
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+TRACEMALLOC_FRAMES = 10
+SAMPLE_INTERVAL = 0.005
+
+
+class StackSampler:
+    """
+    Раз в `interval` секунд снимает стеки всех потоков через
+    sys._current_frames и считает одинаковые стеки. cProfile видит
+    только поток, в котором включён, а опрос API и рассылка идут
+    в потоках fetch_* и notify-*.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Запускает фоновый поток выборки."""
+        self._thread = threading.Thread(
+            target=self._run, name="profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает выборку."""
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        """
+        Пишет стеки в формате collapsed stacks (flamegraph.pl,
+        speedscope): "поток;функция;...;функция число".
+        """
+        with open(path, "w", encoding="UTF-8") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{';'.join(stack)} {count}\n")
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {
+                thread.ident: thread.name for thread in threading.enumerate()
+            }
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    name = names.get(ident, ident)
+                    self.stacks[self._stack(name, frame)] += 1
+
+    @staticmethod
+    def _stack(thread_name, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                f":{code.co_firstlineno})"
+            )
+            frame = frame.f_back
+        stack.append(str(thread_name))
+        return tuple(reversed(stack))
+
+
+class Profiler:
+    """
+    SIGUSR1 включает cProfile для главного потока и выборку стеков
+    всех потоков; повторный SIGUSR1 выключает их и пишет
+    `output_dir/cpu-<время>.prof` (главный поток) и
+    `output_dir/cpu-<время>.folded` (все потоки).
+    SIGUSR2 включает tracemalloc, повторный SIGUSR2 пишет снимок
+    в `output_dir/memory-<время>.snapshot` и выключает tracemalloc.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self._cpu = None
+        self._sampler = None
+        self._previous = {}
+
+    def install(self):
+        """Устанавливает обработчики сигналов (только из главного потока)."""
+        handlers = {"SIGUSR1": self.toggle_cpu, "SIGUSR2": self.toggle_memory}
+        for name, handler in handlers.items():
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                self._previous[signum] = signal.signal(
+                    signum, lambda signum, frame, handler=handler: handler()
+                )
+
+    def restore(self):
+        """Выключает профилирование и возвращает прежние обработчики."""
+        if self._cpu is not None:
+            self.toggle_cpu()
+        for signum, handler in self._previous.items():
+            signal.signal(signum, handler)
+        self._previous.clear()
+
+    def toggle_cpu(self):
+        """Включает cProfile или сохраняет накопленный профиль."""
+        if self._cpu is None:
+            self._cpu = cProfile.Profile()
+            self._cpu.enable()
+            self._sampler = StackSampler()
+            self._sampler.start()
+            logging.info("Профилирование CPU включено.")
+            return None
+        self._cpu.disable()
+        self._sampler.stop()
+        path = self._path("cpu", "prof")
+        try:
+            self._cpu.dump_stats(path)
+            self._sampler.dump(path[:-len("prof")] + "folded")
+            logging.info("Профиль CPU сохранён в " + path)
+        except OSError as error:
+            logging.error("Не удалось сохранить профиль: " + str(error))
+            path = None
+        self._cpu = None
+        self._sampler = None
+        return path
+
+    def toggle_memory(self):
+        """Включает tracemalloc или сохраняет снимок памяти."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            logging.info("Трассировка памяти включена.")
+            return None
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        path = self._path("memory", "snapshot")
+        try:
+            snapshot.dump(path)
+            logging.info("Снимок памяти сохранён в " + path)
+        except OSError as error:
+            logging.error("Не удалось сохранить снимок: " + str(error))
+            return None
+        for stat in snapshot.statistics("lineno")[:TRACEMALLOC_FRAMES]:
+            logging.debug(str(stat))
+        return path
+
+    def _path(self, kind, extension):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(
+            self.output_dir, f"{kind}-{stamp}-{os.getpid()}.{extension}"
+        )
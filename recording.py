@@ -0,0 +1,113 @@
+"""Запись ответов API и отправленных сообщений для воспроизведения."""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from functools import partial
+
+from results import Err, Ok
+
+OAUTH_TOKEN = re.compile(r"OAuth\s+([^\s'\"{}(),]+)")
+
+
+def scrub(token):
+    """Стабильный псевдоним токена, по которому его не восстановить."""
+    return hashlib.sha256(str(token).encode()).hexdigest()[:12]
+
+
+def scrub_text(text, token=None):
+    """
+    Текст ошибки или сообщения с псевдонимами вместо токена `token`
+    и любых заголовков "OAuth <токен>".
+    """
+    text = OAUTH_TOKEN.sub(
+        lambda match: "OAuth " + scrub(match.group(1)), str(text)
+    )
+    if token:
+        text = text.replace(str(token), scrub(token))
+    return text
+
+
+class Recorder:
+    """
+    Дописывает события в файл JSON Lines:
+    {"t": время, "kind": "answer", "user": псевдоним, "fromdate": ...,
+    "response": ...} или "error": текст ошибки, в режиме нескольких
+    подписчиков — и "chats": чаты, следящие за токеном;
+    {"t": время, "kind": "send", "chat": id чата, "message": ...}.
+    Токены в файл не попадают: в текстах ошибок и сообщений они
+    заменяются псевдонимами.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def fetch(self, token, fetch, chats=None):
+        """
+        Оборачивает fetch(fromdate) одного подписчика; `chats` —
+        чаты, которым уйдёт сообщение по ответу.
+        """
+        answer_event = partial(self._answer, scrub(token), chats=chats)
+
+        def recorded(fromdate):
+            try:
+                answer = fetch(fromdate)
+            except Exception as error:
+                answer_event(fromdate, error=scrub_text(error, token))
+                raise
+            if isinstance(answer, Err):
+                answer_event(
+                    fromdate, error=scrub_text(answer.detail, token)
+                )
+            else:
+                response = answer.value if isinstance(answer, Ok) else answer
+                answer_event(fromdate, response=response)
+            return answer
+
+        return recorded
+
+    def fetch_for(self, fetch_one, chats=None):
+        """
+        Оборачивает fetch_one(token, fromdate) пакетного опроса.
+        `chats(token)` — чаты, следящие за токеном.
+        """
+
+        def recorded(token, fromdate):
+            return self.fetch(
+                token,
+                partial(fetch_one, token),
+                chats(token) if chats else None,
+            )(fromdate)
+
+        return recorded
+
+    def notify(self, chat_id, notify):
+        """Оборачивает notify(message) одного чата."""
+
+        def recorded(message):
+            sent = notify(message)
+            self._write({"kind": "send", "chat": str(chat_id),
+                         "message": scrub_text(message),
+                         "sent": bool(sent)})
+            return sent
+
+        return recorded
+
+    def _answer(self, user, fromdate, chats=None, **result):
+        event = {"kind": "answer", "user": user, "fromdate": fromdate}
+        if chats is not None:
+            event["chats"] = [str(chat_id) for chat_id in chats]
+        self._write({**event, **result})
+
+    def _write(self, event):
+        event["t"] = round(time.time(), 3)
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            try:
+                with open(self.path, "a", encoding="UTF-8") as file:
+                    file.write(line + "\n")
+            except OSError as error:
+                logging.error("Не удалось записать событие: " + str(error))
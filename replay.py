@@ -0,0 +1,117 @@
+"""
+Воспроизведение записанного Recorder трафика через цикл опроса.
+
+Запуск: python replay.py record.jsonl [--speed 100] [--fast-path]
+"""
+import argparse
+import json
+import logging
+import time
+from collections import Counter, namedtuple
+
+import homework
+from results import Err, Ok
+
+ReplayReport = namedtuple(
+    "ReplayReport", ("polls", "recorded", "replayed", "elapsed")
+)
+
+
+def load_events(path):
+    """Читает события записи в порядке времени."""
+    with open(path, encoding="UTF-8") as file:
+        events = [json.loads(line) for line in file if line.strip()]
+    events.sort(key=lambda event: event["t"])
+    return events
+
+
+def recorded_fetch(event, fast_path):
+    """fetch(fromdate), возвращающий записанный ответ или ошибку."""
+
+    def fetch(fromdate):
+        if "error" in event:
+            if fast_path:
+                return Err("request", event["error"])
+            raise ConnectionError(event["error"])
+        return Ok(event["response"]) if fast_path else event["response"]
+
+    return fetch
+
+
+def recorded_notify(event, replayed):
+    """
+    notify(message), отправляющий сообщение в каждый записанный
+    чат ответа `event` (в один, если чаты не записаны).
+    """
+    chats = event.get("chats") or [None]
+
+    def notify(message):
+        replayed.extend(message for _ in chats)
+        return True
+
+    return notify
+
+
+def replay(events, speed=0.0, fast_path=False):
+    """
+    Прогоняет записанные ответы через poll_homeworks и собирает
+    отправленные сообщения — по одному на каждый чат, следивший
+    за токеном. `speed` — во сколько раз быстрее реального времени
+    (0 — без пауз).
+    """
+    poll = homework.poll_homeworks_fast if fast_path else (
+        homework.poll_homeworks
+    )
+    states = {}
+    recorded = []
+    replayed = []
+    polls = 0
+    started = time.monotonic()
+    first = events[0]["t"] if events else 0
+    for event in events:
+        if speed:
+            delay = (event["t"] - first) / speed - (
+                time.monotonic() - started
+            )
+            if delay > 0:
+                time.sleep(delay)
+        if event["kind"] == "send":
+            if event.get("sent", True):
+                recorded.append(event["message"])
+            continue
+        polls += 1
+        user = event["user"]
+        state = states.get(user) or homework.new_state(event["fromdate"])
+        states[user] = poll(
+            recorded_fetch(event, fast_path),
+            recorded_notify(event, replayed),
+            state,
+        )
+    return ReplayReport(polls, recorded, replayed, time.monotonic() - started)
+
+
+def main():
+    """Воспроизводит запись и сравнивает отправленные сообщения."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=0.0)
+    parser.add_argument("--fast-path", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    report = replay(load_events(args.path), args.speed, args.fast_path)
+    print(
+        f"Опросов: {report.polls}, сообщений: записано "
+        f"{len(report.recorded)}, воспроизведено {len(report.replayed)}, "
+        f"за {report.elapsed:.2f} с"
+    )
+    missing = Counter(report.recorded) - Counter(report.replayed)
+    extra = Counter(report.replayed) - Counter(report.recorded)
+    for message in missing.elements():
+        print("Не отправлено при воспроизведении: " + message)
+    for message in extra.elements():
+        print("Лишнее при воспроизведении: " + message)
+    return 1 if missing or extra else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
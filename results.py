@@ -0,0 +1,54 @@
+"""Типизированные результаты проверок — быстрый путь без исключений."""
+from collections import namedtuple
+
+from exceptions import EmptyAnswerAPI, Not200Response
+
+
+class Ok(namedtuple("Ok", ("value",))):
+    """Успешный результат со значением `value`."""
+
+    __slots__ = ()
+    ok = True
+
+    def unwrap(self):
+        """Возвращает значение."""
+        return self.value
+
+
+class Err(namedtuple("Err", ("kind", "detail"))):
+    """Ошибка вида `kind` с пояснением `detail`."""
+
+    __slots__ = ()
+    ok = False
+
+    def unwrap(self):
+        """Выбрасывает исключение, соответствующее ошибке."""
+        raise self.exception()
+
+    def exception(self):
+        """Строит исключение прежнего, «бросающего» API."""
+        return ERRORS[self.kind](self.detail)
+
+
+ERRORS = {
+    "request": ConnectionError,
+    "not_200": Not200Response,
+    "invalid_json": ValueError,
+    "not_dict": TypeError,
+    "no_homeworks": EmptyAnswerAPI,
+    "not_list": TypeError,
+    "unknown_status": ValueError,
+    "no_name": KeyError,
+    "invalid_schema": ValueError,
+}
+
+# Ошибки без переменной части создаются один раз.
+NOT_DICT = Err("not_dict", "Ответ API не является словарем")
+NO_HOMEWORKS = Err("no_homeworks", "Ответ API не содержит ключа 'homeworks'")
+NOT_LIST = Err(
+    "not_list", "API под ключом `homeworks` приходят не в виде списка"
+)
+UNKNOWN_STATUS = Err(
+    "unknown_status", "homework_status нет в HOMEWORK_VERDICTS"
+)
+NO_NAME = Err("no_name", "homework_name отсутствует")
@@ -0,0 +1,151 @@
+"""Очерёдность опроса подписчиков по запасу до срока уведомления."""
+import heapq
+from collections import Counter, deque
+
+from schema import iso_to_epoch
+
+HOT_STATUSES = frozenset(("reviewing",))
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Перцентили `values` методом ближайшего ранга."""
+    ordered = sorted(values)
+    if not ordered:
+        return {point: None for point in points}
+    return {
+        point: ordered[
+            min(len(ordered) - 1, max(0, -(-point * len(ordered) // 100) - 1))
+        ]
+        for point in points
+    }
+
+
+def updated_at(homework):
+    """Время последнего изменения работы из состояния подписчика."""
+    if not homework or homework.get("date_updated") is None:
+        return None
+    value = homework["date_updated"]
+    if isinstance(value, str):
+        try:
+            return iso_to_epoch(value)
+        except ValueError:
+            return None
+    return value
+
+
+class PollScheduler:
+    """
+    Выбирает, кого опрашивать в очередном цикле.
+
+    Работа на проверке или изменённая за последние `recent` секунд —
+    «горячая»: её опрашивают не реже, чем раз в `slo` секунд (цель по
+    времени до уведомления). Остальных — раз в `idle_interval`.
+    Срок опроса подписчика — время прошлого опроса плюс его интервал;
+    в цикл длиной `period` попадают те, чей срок наступит до следующего
+    цикла, по возрастанию запаса до срока (при равном — «горячие»
+    первыми). Если их больше `capacity`, откладываются те, у кого запас
+    больше: прежде всего «холодные», но просроченные из них не
+    голодают.
+
+    Срок и признак «горячей» работы вычисляются в observe() по
+    состоянию после опроса и хранятся здесь же — в `schedule`
+    (ключ -> (срок, горячая)) и куче сроков, поэтому select() не
+    читает состояния подписчиков. Новый ключ опрашивается сразу.
+
+    Время до уведомления — от date_updated работы до отправки
+    сообщения; последние `history` значений хранятся для каждого
+    подписчика.
+    """
+
+    def __init__(self, slo, period, idle_interval=None, recent=24 * 60 * 60,
+                 capacity=None, history=100):
+        self.slo = slo
+        self.period = period
+        self.idle_interval = idle_interval or period
+        self.recent = recent
+        self.capacity = capacity
+        self.history = history
+        self.schedule = {}
+        self.latencies = {}
+        self._heap = []
+        self.deferred = 0
+        self.due = Counter()
+
+    def is_hot(self, state, now):
+        """Работа на проверке или недавно изменилась."""
+        homework = state.get("homework")
+        if homework and homework.get("status") in HOT_STATUSES:
+            return True
+        changed = updated_at(homework)
+        return changed is not None and now - changed < self.recent
+
+    def select(self, keys, now):
+        """
+        Ключи из `keys` (множество или словарь подписок), которые пора
+        опросить, в порядке срочности. Ключи, которых больше нет
+        в `keys`, забываются.
+        """
+        for key in keys:
+            if key not in self.schedule:
+                self._plan(key, 0, False)
+        due = []
+        while self._heap and self._heap[0][0] - now < self.period:
+            entry = heapq.heappop(self._heap)
+            planned, cold, key = entry
+            if self.schedule.get(key) != (planned, not cold):
+                continue  # срок уже пересчитан в observe()
+            if key not in keys:
+                del self.schedule[key]
+                continue
+            self.due["idle" if cold else "hot"] += 1
+            due.append(entry)
+        if self.capacity is not None and len(due) > self.capacity:
+            self.deferred += len(due) - self.capacity
+        # выбранные возвращаются в кучу: если observe() не будет,
+        # ключ выберут снова; иначе запись станет устаревшей
+        for entry in due:
+            heapq.heappush(self._heap, entry)
+        return [key for _, _, key in due[:self.capacity]]
+
+    def observe(self, key, before, after, now):
+        """
+        Отмечает опрос `key` и назначает следующий по состоянию `after`;
+        если сообщение о работе отправлено, запоминает время до
+        уведомления.
+        """
+        hot = self.is_hot(after, now)
+        self._plan(key, now + (self.slo if hot else self.idle_interval), hot)
+        report = after["prev_report"]
+        if report == before["prev_report"] or report["name"] is None:
+            return
+        changed = updated_at(after.get("homework"))
+        if changed is None:
+            return
+        latencies = self.latencies.get(key)
+        if latencies is None:
+            latencies = self.latencies[key] = deque(maxlen=self.history)
+        latencies.append(max(0, now - changed))
+
+    def _plan(self, key, planned, hot):
+        self.schedule[key] = (planned, hot)
+        heapq.heappush(self._heap, (planned, not hot, key))
+
+    def user_percentiles(self, key, points=(50, 90, 99)):
+        """Перцентили времени до уведомления одного подписчика."""
+        return percentiles(self.latencies.get(key, ()), points)
+
+    def report(self):
+        """Сводка: перцентили по всем, доля в SLO, отложенные опросы."""
+        # копии: отчёт читают из потока HTTP-проверок
+        users = [list(values) for values in list(self.latencies.values())]
+        values = [value for latencies in users for value in latencies]
+        users_p90 = [percentiles(latencies, (90,))[90] for latencies in users]
+        within = sum(value <= self.slo for value in users_p90)
+        return {
+            "time_to_notify": percentiles(values),
+            "users_within_slo": (
+                round(within / len(users_p90), 3) if users_p90 else None
+            ),
+            "due": dict(self.due),
+            "deferred": self.deferred,
+        }
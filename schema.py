@@ -0,0 +1,122 @@
+"""Декларативная схема ответа API и валидатор, собираемый из неё."""
+from collections import namedtuple
+from datetime import datetime
+
+Field = namedtuple(
+    "Field", ("name", "type", "required", "convert"), defaults=(True, None)
+)
+
+
+class FieldError(namedtuple("FieldError", ("path", "problem", "expected"))):
+    """Ошибка одного поля: путь, вид проблемы и ожидаемый тип."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        if self.problem == MISSING:
+            return f"{self.path}: поле отсутствует"
+        if self.problem == BAD_FORMAT:
+            return f"{self.path}: неверный формат"
+        return f"{self.path}: ожидался {self.expected.__name__}"
+
+
+ValidationResult = namedtuple("ValidationResult", ("value", "errors"))
+
+MISSING = "missing"
+WRONG_TYPE = "type"
+BAD_FORMAT = "format"
+
+
+def iso_to_epoch(value):
+    """'2020-02-13T14:40:57Z' -> 1581604857."""
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return int(moment.timestamp())
+
+
+HOMEWORK_SCHEMA = (
+    Field("id", int, required=False),
+    Field("status", str),
+    Field("homework_name", str),
+    Field("lesson_name", str, required=False),
+    Field("date_updated", str, required=False, convert=iso_to_epoch),
+)
+
+RESPONSE_SCHEMA = (
+    Field("homeworks", list),
+    Field("current_date", int, required=False),
+)
+
+
+def compile_fields(fields):
+    """
+    Собирает из полей схемы функцию check(data, path, errors),
+    которая за один проход проверяет словарь и возвращает новый
+    словарь только с полями схемы (с применёнными convert).
+    """
+    checks = tuple(
+        (field.name, field.type, field.required, field.convert)
+        for field in fields
+    )
+    missing = object()
+
+    def check(data, path, errors):
+        result = {}
+        for name, expected, required, convert in checks:
+            value = data.get(name, missing)
+            if value is missing:
+                if required:
+                    errors.append(FieldError(path + name, MISSING, expected))
+                continue
+            if type(value) is not expected:
+                errors.append(FieldError(path + name, WRONG_TYPE, expected))
+                continue
+            if convert is not None:
+                try:
+                    value = convert(value)
+                except (TypeError, ValueError):
+                    errors.append(
+                        FieldError(path + name, BAD_FORMAT, expected)
+                    )
+                    continue
+            result[name] = value
+        return result
+
+    return check
+
+
+def compile_schema(response_fields=RESPONSE_SCHEMA,
+                   item_fields=HOMEWORK_SCHEMA):
+    """
+    Компилирует схему ответа в validate(payload, limit=None) ->
+    ValidationResult. value — нормализованный ответ (None, если нарушен
+    верхний уровень), errors — список FieldError по всем полям
+    проверенных работ. С `limit` проверяются и попадают в value только
+    первые `limit` работ: остальная история не разбирается.
+    """
+    check_response = compile_fields(response_fields)
+    check_item = compile_fields(item_fields)
+
+    def validate(payload, limit=None):
+        if type(payload) is not dict:
+            return ValidationResult(None, [FieldError("", WRONG_TYPE, dict)])
+        errors = []
+        value = check_response(payload, "", errors)
+        if errors:
+            return ValidationResult(None, errors)
+        homeworks = []
+        items = value["homeworks"]
+        if limit is not None:
+            items = items[:limit]
+        for index, item in enumerate(items):
+            path = f"homeworks[{index}]"
+            if type(item) is not dict:
+                errors.append(FieldError(path, WRONG_TYPE, dict))
+                continue
+            homeworks.append(check_item(item, path + ".", errors))
+        value["homeworks"] = homeworks
+        return ValidationResult(value, errors)
+
+    return validate
+
+
+validate_response = compile_schema()
@@ -0,0 +1,108 @@
+"""Корректная остановка и горячая перезагрузка настроек по сигналам."""
+import logging
+import signal
+import time
+from contextlib import contextmanager
+
+from exceptions import ShutdownRequested
+
+STOP_SIGNALS = ("SIGTERM", "SIGINT")
+
+
+class Lifecycle:
+    """
+    Обработчик сигналов для основного цикла бота.
+
+    SIGTERM/SIGINT во время ожидания прерывают сон сразу, а во время
+    запроса к API или отправки сообщения лишь выставляют флаг: текущий
+    цикл доделывается, после чего бот выходит. Если цикл не уложился
+    в `deadline` секунд, выход форсируется через SIGALRM. Тот же срок,
+    отсчитанный от сигнала, делят между собой все шаги остановки
+    (см. time_left()).
+    SIGHUP вызывает `on_reload`: сразу, если бот ждёт, иначе —
+    по окончании текущего цикла.
+    """
+
+    def __init__(self, deadline, on_reload=None):
+        self.deadline = deadline
+        self.on_reload = on_reload
+        self.stopping = False
+        self.stop_deadline = None
+        self.reload_pending = False
+        self._idle = False
+        self._previous = {}
+
+    def install(self):
+        """Устанавливает обработчики сигналов (только из главного потока)."""
+        handlers = {name: self._on_stop for name in STOP_SIGNALS}
+        handlers["SIGHUP"] = self._on_reload
+        handlers["SIGALRM"] = self._on_deadline
+        for name, handler in handlers.items():
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                self._previous[signum] = signal.signal(signum, handler)
+
+    def restore(self):
+        """Возвращает обработчики, бывшие до `install()`."""
+        if hasattr(signal, "alarm"):
+            signal.alarm(0)
+        for signum, handler in self._previous.items():
+            signal.signal(signum, handler)
+        self._previous.clear()
+
+    @contextmanager
+    def idle(self):
+        """Помечает участок, где бота можно прервать немедленно."""
+        if self.stopping:
+            raise ShutdownRequested("остановка до начала ожидания")
+        self._idle = True
+        try:
+            yield
+        finally:
+            self._idle = False
+
+    def time_left(self):
+        """
+        Сколько секунд осталось до срока остановки. Если сигнала не
+        было, срок отсчитывается от первого вызова.
+        """
+        if self.stop_deadline is None:
+            self.stop_deadline = time.monotonic() + self.deadline
+        return max(0.0, self.stop_deadline - time.monotonic())
+
+    def apply_pending_reload(self):
+        """Применяет отложенную перезагрузку настроек, если она была."""
+        if self.reload_pending:
+            self.reload_pending = False
+            self._reload()
+
+    def _reload(self):
+        if self.on_reload is None:
+            return
+        try:
+            self.on_reload()
+        except Exception as error:
+            logging.error("Ошибка перезагрузки настроек: " + str(error))
+
+    def _on_stop(self, signum, frame):
+        logging.info(f"Получен сигнал {signum}, останавливаем бота.")
+        self.stopping = True
+        if self.stop_deadline is None:
+            self.stop_deadline = time.monotonic() + self.deadline
+        if self._idle:
+            raise ShutdownRequested(f"сигнал {signum}")
+        if hasattr(signal, "alarm"):
+            signal.alarm(self.deadline)
+
+    def _on_deadline(self, signum, frame):
+        if self.stopping:
+            raise ShutdownRequested(
+                f"текущий цикл не завершился за {self.deadline} с"
+            )
+
+    def _on_reload(self, signum, frame):
+        logging.info("Получен SIGHUP, перезагружаем настройки.")
+        if self._idle:
+            self._reload()
+        else:
+            self.reload_pending = True
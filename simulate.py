@@ -0,0 +1,287 @@
+"""
+Детерминированная симуляция цикла опроса в виртуальном времени.
+
+Запуск: python simulate.py [--users 1000] [--days 3] [--seed 1]
+[--retry-period 600] [--request-cost 0] [--capacity N] [--slo 600]
+[--idle-interval 3600] [--fast-path]
+"""
+import argparse
+import logging
+import os
+import random
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+os.environ.setdefault("PRACTICUM_TOKEN", "simulation")
+
+import homework  # noqa: E402
+from batch import BatchResult  # noqa: E402
+from clock import VirtualClock  # noqa: E402
+from digest import Digest  # noqa: E402
+from results import Ok  # noqa: E402
+from scheduler import PollScheduler, percentiles  # noqa: E402
+from subscribers import Subscriber, SubscriptionIndex  # noqa: E402
+
+DAY = 24 * 60 * 60
+START = 1_700_000_000
+
+SimulationReport = namedtuple(
+    "SimulationReport",
+    (
+        "users",
+        "polls",
+        "changes",
+        "notifications",
+        "latencies",
+        "scheduler",
+        "elapsed",
+    ),
+)
+
+
+def iso(moment):
+    """Время в формате date_updated API."""
+    return datetime.fromtimestamp(moment, timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+
+
+class FakeApi:
+    """
+    API домашних работ со сгенерированной историей статусов.
+
+    Для каждого токена из `seed` заранее строится последовательность
+    работ: сдача (reviewing), вердикт через случайное время, при
+    отклонении — повторная сдача, пока работу не примут. Ответ зависит
+    только от `from_date` и текущего времени часов `clock`.
+    """
+
+    def __init__(self, tokens, clock, seed=1, start=START, days=1,
+                 submit_every=DAY, review_time=4 * 60 * 60,
+                 reject_rate=0.4):
+        self.clock = clock
+        self.requests = 0
+        self._times = {}
+        self._homeworks = {}
+        rng = random.Random(seed)
+        end = start + days * DAY
+        for token in tokens:
+            times, homeworks = [], []
+            moment = start + rng.expovariate(1 / submit_every)
+            number = 0
+            while moment < end:
+                number += 1
+                status = "reviewing"
+                while True:
+                    times.append(int(moment))
+                    homeworks.append({
+                        "id": number,
+                        "status": status,
+                        "homework_name": f"{token}__hw{number}.zip",
+                        "lesson_name": f"Спринт {number}",
+                        "date_updated": iso(moment),
+                    })
+                    if status == "approved":
+                        break
+                    if status == "reviewing":
+                        moment += rng.expovariate(1 / review_time)
+                        approved = rng.random() >= reject_rate
+                        status = "approved" if approved else "rejected"
+                    else:
+                        moment += rng.expovariate(1 / review_time)
+                        status = "reviewing"
+                moment += rng.expovariate(1 / submit_every)
+            self._times[token] = times
+            self._homeworks[token] = homeworks
+
+    def fetch(self, token, fromdate):
+        """Ответ API для `token`: последняя работа, изменённая с `fromdate`."""
+        self.requests += 1
+        now = self.clock.time()
+        times = self._times[token]
+        last = bisect_right(times, now)
+        if bisect_left(times, fromdate) >= last:
+            homeworks = []
+        else:
+            homeworks = [self._homeworks[token][last - 1]]
+        return {"homeworks": homeworks, "current_date": int(now)}
+
+    def changed_at(self, token):
+        """Время последнего изменения статуса к текущему моменту."""
+        times = self._times[token]
+        last = bisect_right(times, self.clock.time())
+        return times[last - 1] if last else None
+
+    def changes(self, until):
+        """Сколько изменений статуса произошло до `until`."""
+        return sum(
+            bisect_right(times, until) for times in self._times.values()
+        )
+
+
+class SimFetcher:
+    """
+    Опрос FakeApi по одному запросу, без потоков: каждый запрос
+    занимает `request_cost` виртуальных секунд.
+    """
+
+    def __init__(self, api, clock, request_cost=0.0, fast_path=False):
+        self.api = api
+        self.clock = clock
+        self.request_cost = request_cost
+        self.fast_path = fast_path
+
+    def fetch(self, due):
+        """Ответы для пар (subscriber, fromdate), как BatchFetcher."""
+        for subscriber, fromdate in due:
+            response = self.api.fetch(subscriber.token, fromdate)
+            self.clock.sleep(self.request_cost)
+            if self.fast_path:
+                response = Ok(response)
+            yield BatchResult(subscriber, response)
+
+    def close(self):
+        """Потоков нет — закрывать нечего."""
+
+
+class SimFanOut:
+    """
+    Доставка без очередей: сообщение сразу считается отправленным,
+    а время от изменения статуса до отправки записывается в
+    `latencies[chat_id]`. Чат симуляции совпадает с токеном.
+    """
+
+    def __init__(self, api, clock, latencies):
+        self.api = api
+        self.clock = clock
+        self.latencies = latencies
+
+    def deliver(self, channels, target, message, key=None):
+        """Записывает время до уведомления; всегда True."""
+        self.latencies[target].append(
+            self.clock.time() - self.api.changed_at(target)
+        )
+        return True
+
+    def submit(self, channel, target, message, key=None):
+        """Один канал — то же, что deliver."""
+        return self.deliver((channel,), target, message, key)
+
+    def stats(self):
+        """Счётчиков очередей нет."""
+        return {}
+
+    def close(self, timeout):
+        """Очередей нет — ждать нечего."""
+
+
+@contextmanager
+def swapped(module, **values):
+    """Временно подменяет глобальные имена модуля."""
+    previous = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(module, name, value)
+
+
+def simulate(users=1000, days=1, seed=1, retry_period=600,
+             request_cost=0.0, fast_path=False, start=START, capacity=None,
+             slo=None, idle_interval=None):
+    """
+    Прогоняет `days` суток опроса `users` пользователей через
+    check_subscribers в виртуальном времени: часы, подписки,
+    планировщик и сводки бота подменяются на время прогона.
+    `request_cost` — сколько виртуальных секунд занимает один запрос
+    к API. Кого опрашивать в цикле, решает PollScheduler с `capacity`,
+    `slo` и `idle_interval`.
+    """
+    clock = VirtualClock(start)
+    tokens = [f"user{index}" for index in range(users)]
+    api = FakeApi(tokens, clock, seed, start, days)
+    latencies = {token: [] for token in tokens}
+    fetcher = SimFetcher(api, clock, request_cost, fast_path)
+    fanout = SimFanOut(api, clock, latencies)
+    scheduler = PollScheduler(
+        slo or retry_period, retry_period, idle_interval, capacity=capacity
+    )
+    state = {}
+    end = start + days * DAY
+    started = time.monotonic()
+    with swapped(
+        homework,
+        CLOCK=clock,
+        SUBSCRIPTIONS=SubscriptionIndex(
+            Subscriber(token, token) for token in tokens
+        ),
+        SCHEDULER=scheduler,
+        DIGEST=Digest(homework.DIGEST_WINDOW, clock=clock.monotonic),
+        FAST_PATH=fast_path,
+        RECORDER=None,
+    ):
+        while clock.time() < end:
+            state = homework.check_subscribers(fanout, fetcher, state)
+            clock.sleep(retry_period)
+    return SimulationReport(
+        users,
+        api.requests,
+        api.changes(end),
+        sum(map(len, latencies.values())),
+        latencies,
+        scheduler.report(),
+        time.monotonic() - started,
+    )
+
+
+def main():
+    """Запускает симуляцию и печатает время до уведомления."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--retry-period", type=int, default=600)
+    parser.add_argument("--request-cost", type=float, default=0.0)
+    parser.add_argument("--capacity", type=int)
+    parser.add_argument("--slo", type=int)
+    parser.add_argument("--idle-interval", type=int)
+    parser.add_argument("--fast-path", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+    report = simulate(
+        args.users,
+        args.days,
+        args.seed,
+        args.retry_period,
+        args.request_cost,
+        args.fast_path,
+        capacity=args.capacity,
+        slo=args.slo,
+        idle_interval=args.idle_interval,
+    )
+    latencies = [
+        value for values in report.latencies.values() for value in values
+    ]
+    print(
+        f"Пользователей: {report.users}, опросов: {report.polls}, "
+        f"изменений статуса: {report.changes}, "
+        f"уведомлений: {report.notifications}, "
+        f"за {report.elapsed:.2f} с"
+    )
+    for point, value in percentiles(latencies).items():
+        print(f"p{point} времени до уведомления: {value} с")
+    print(
+        f"Отложено опросов: {report.scheduler['deferred']}, "
+        "пользователей с p90 в пределах SLO: "
+        f"{report.scheduler['users_within_slo']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
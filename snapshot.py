@@ -0,0 +1,235 @@
+"""
+Бинарный снимок состояния подписчиков для быстрого перезапуска.
+
+Формат файла:
+    заголовок  <8sI>    магия HWSNAP01, число записей n;
+    индекс     n x <16sQII>  blake2b-хеш ключа, смещение данных,
+               длина ключа, длина значения — отсортирован по хешу;
+    данные     ключ (UTF-8) и значение (JSON) каждой записи подряд.
+Файл открывается через mmap; запись ищется двоичным поиском по индексу
+и декодируется только при первом обращении.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from collections.abc import MutableMapping
+
+MAGIC = b"HWSNAP01"
+HEADER = struct.Struct("<8sI")
+RECORD = struct.Struct("<16sQII")
+
+
+def key_digest(key):
+    """Хеш ключа для индекса снимка."""
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+class Snapshot:
+    """Снимок, открытый только на чтение через mmap."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} не является снимком состояния")
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        """(хеш, смещение, длина ключа, длина значения) записи."""
+        return RECORD.unpack_from(
+            self._map, HEADER.size + index * RECORD.size
+        )
+
+    def find(self, key):
+        """Номер записи с ключом `key` или None."""
+        digest = key_digest(key)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.record(middle)[0] < digest:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.record(low)[0] == digest:
+            return low
+        return None
+
+    def key(self, index):
+        """Ключ записи."""
+        _, offset, key_length, _ = self.record(index)
+        return self._map[offset:offset + key_length].decode()
+
+    def raw_value(self, index):
+        """Значение записи в виде байтов JSON, без разбора."""
+        _, offset, key_length, value_length = self.record(index)
+        start = offset + key_length
+        return self._map[start:start + value_length]
+
+    def close(self):
+        """Закрывает отображение файла."""
+        self._map.close()
+
+
+def write_snapshot(path, records):
+    """
+    Атомарно записывает снимок из пар (ключ, байты JSON значения):
+    во временный файл, затем os.replace.
+    """
+    entries = sorted(
+        (key_digest(key), key.encode(), value) for key, value in records
+    )
+    offset = HEADER.size + len(entries) * RECORD.size
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(entries)))
+        for digest, key, value in entries:
+            file.write(RECORD.pack(digest, offset, len(key), len(value)))
+            offset += len(key) + len(value)
+        for _, key, value in entries:
+            file.write(key)
+            file.write(value)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class SnapshotState(MutableMapping):
+    """
+    Состояние подписчиков поверх снимка `path`.
+
+    Записи из снимка декодируются `decode` при первом обращении и
+    переносятся в `base` (словарь или StateStore); изменения живут
+    в `base`. checkpoint() раз в `interval` секунд пишет новый снимок:
+    заново кодируются только записи, изменённые с прошлого снимка,
+    остальные копируются из старого без разбора и без обращения
+    к `base`. Записи, которые уже лежали в `base` при открытии и
+    которых нет в снимке, находятся при первом checkpoint(), чтобы
+    не обходить `base` (например, shelve StateStore) при старте.
+    """
+
+    def __init__(self, path, base=None, interval=300, decode=json.loads,
+                 clock=time.monotonic):
+        self.path = path
+        self.base = {} if base is None else base
+        self.interval = interval
+        self.decode = decode
+        self.clock = clock
+        self._deleted = set()
+        self._dirty = set()
+        self._base_synced = False
+        self._written = clock()
+        self._snapshot = None
+        if os.path.exists(path):
+            try:
+                self._snapshot = Snapshot(path)
+                logging.info(f"Снимок {path}: {len(self._snapshot)} записей.")
+            except (OSError, ValueError, struct.error) as error:
+                logging.error("Снимок не прочитан: " + str(error))
+
+    def __getitem__(self, key):
+        if key in self.base:
+            return self.base[key]
+        index = self._find(key)
+        if index is None:
+            raise KeyError(key)
+        value = self.decode(self._snapshot.raw_value(index))
+        self.base[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self.base[key] = value
+        self._dirty.add(key)
+        self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key in self.base:
+            del self.base[key]
+        elif self._find(key) is None:
+            raise KeyError(key)
+        self._dirty.discard(key)
+        self._deleted.add(key)
+
+    def __contains__(self, key):
+        return key in self.base or self._find(key) is not None
+
+    def __iter__(self):
+        yield from list(self.base)
+        for index, key in self._snapshot_keys():
+            yield key
+
+    def __len__(self):
+        return len(self.base) + sum(1 for _ in self._snapshot_keys())
+
+    def stats(self):
+        """Счётчики base и размер снимка."""
+        stats = dict(getattr(self.base, "stats", dict)())
+        stats["snapshot"] = len(self._snapshot) if self._snapshot else 0
+        return stats
+
+    def checkpoint(self, force=False):
+        """Пишет снимок, если прошло `interval` секунд (или `force`)."""
+        if not force and self.clock() - self._written < self.interval:
+            return
+        started = time.monotonic()
+        if not self._base_synced:
+            self._dirty.update(
+                key for key in self.base
+                if key not in self._deleted and self._find(key) is None
+            )
+        # чтение без продвижения в LRU и без счётчиков StateStore
+        peek = getattr(self.base, "peek", self.base.__getitem__)
+        records = [
+            (key, json.dumps(peek(key), ensure_ascii=False).encode())
+            for key in self._dirty
+        ]
+        if self._snapshot is not None:
+            for index in range(len(self._snapshot)):
+                key = self._snapshot.key(index)
+                if key not in self._dirty and key not in self._deleted:
+                    records.append((key, self._snapshot.raw_value(index)))
+        try:
+            write_snapshot(self.path, records)
+            snapshot = Snapshot(self.path)
+        except (OSError, ValueError) as error:
+            logging.error("Снимок не записан: " + str(error))
+            return
+        if self._snapshot is not None:
+            self._snapshot.close()
+        self._snapshot = snapshot
+        self._dirty.clear()
+        self._deleted.clear()
+        self._base_synced = True
+        self._written = self.clock()
+        logging.info(
+            f"Снимок из {len(records)} записей за "
+            f"{time.monotonic() - started:.2f} с."
+        )
+
+    def close(self):
+        """Пишет последний снимок и закрывает хранилища."""
+        self.checkpoint(force=True)
+        if self._snapshot is not None:
+            self._snapshot.close()
+        if hasattr(self.base, "close"):
+            self.base.close()
+
+    def _find(self, key):
+        if self._snapshot is None or key in self._deleted:
+            return None
+        return self._snapshot.find(key)
+
+    def _snapshot_keys(self):
+        if self._snapshot is None:
+            return
+        for index in range(len(self._snapshot)):
+            key = self._snapshot.key(index)
+            if key not in self.base and key not in self._deleted:
+                yield index, key
@@ -0,0 +1,136 @@
+"""Состояние подписчиков с вытеснением редко нужных записей на диск."""
+import logging
+import os
+import shelve
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+RSS_CHECK_EVERY = 256
+RSS_EVICT_SHARE = 0.1
+
+
+def current_rss():
+    """Текущий RSS процесса в байтах (Linux) или None."""
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class StateStore(MutableMapping):
+    """
+    Словарь token -> состояние подписчика, в памяти которого держатся
+    только недавно использованные записи (LRU).
+
+    Если в памяти больше `max_resident` записей или RSS процесса
+    превысил `max_rss` байт, самые давние записи уходят в shelve-файл
+    `path` и подгружаются обратно при обращении. Записи в памяти и
+    на диске не пересекаются. Счётчики hits/misses/evictions помогают
+    подобрать бюджет.
+
+    Освобождённая память редко возвращается системе, поэтому RSS
+    после вытеснения почти не падает. Превышение `max_rss` снижает
+    лимит записей в памяти (`rss_resident`) на RSS_EVICT_SHARE, только
+    пока RSS от проверки к проверке падает; дальше лимит держится.
+    """
+
+    def __init__(self, path, max_resident=None, max_rss=None):
+        self.max_resident = max_resident
+        self.max_rss = max_rss
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rss_resident = None
+        self._last_rss = None
+        self._hot = OrderedDict()
+        self._cold = shelve.open(path)
+        self._operations = 0
+
+    def __getitem__(self, key):
+        if key in self._hot:
+            self.hits += 1
+            self._hot.move_to_end(key)
+            return self._hot[key]
+        value = self._cold.pop(key)
+        self.misses += 1
+        self._hot[key] = value
+        self._evict()
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self._hot and key in self._cold:
+            del self._cold[key]
+        self._hot[key] = value
+        self._hot.move_to_end(key)
+        self._evict()
+
+    def __delitem__(self, key):
+        if key in self._hot:
+            del self._hot[key]
+        else:
+            del self._cold[key]
+
+    def __contains__(self, key):
+        return key in self._hot or key in self._cold
+
+    def peek(self, key):
+        """Значение без подъёма в память и без учёта в счётчиках."""
+        if key in self._hot:
+            return self._hot[key]
+        return self._cold[key]
+
+    def __iter__(self):
+        yield from list(self._hot)
+        yield from list(self._cold.keys())
+
+    def __len__(self):
+        return len(self._hot) + len(self._cold)
+
+    def stats(self):
+        """Счётчики для подбора бюджета."""
+        return {
+            "resident": len(self._hot),
+            "cold": len(self._cold),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rss_resident": self.rss_resident,
+        }
+
+    def close(self):
+        """Сбрасывает все записи на диск и закрывает файл."""
+        self._evict_oldest(len(self._hot))
+        self._cold.close()
+
+    def _evict(self):
+        self._operations += 1
+        if self.max_rss and self._operations % RSS_CHECK_EVERY == 0:
+            self._check_rss()
+        limits = [
+            limit for limit in (self.max_resident, self.rss_resident)
+            if limit is not None
+        ]
+        if limits:
+            self._evict_oldest(len(self._hot) - min(limits))
+
+    def _check_rss(self):
+        rss = current_rss()
+        if rss is None or rss <= self.max_rss:
+            self._last_rss = None
+            return
+        if self._last_rss is not None and rss >= self._last_rss:
+            # вытеснение не вернуло память: дальше не ужимаемся
+            return
+        logging.debug(f"RSS {rss} больше бюджета {self.max_rss}")
+        self._last_rss = rss
+        self.rss_resident = max(
+            1, int(len(self._hot) * (1 - RSS_EVICT_SHARE))
+        )
+
+    def _evict_oldest(self, count):
+        for _ in range(min(count, len(self._hot))):
+            key, value = self._hot.popitem(last=False)
+            self._cold[key] = value
+            self.evictions += 1
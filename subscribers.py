@@ -0,0 +1,86 @@
+"""Подписчики бота: токены Практикума и чаты Telegram для уведомлений."""
+import json
+from collections import namedtuple
+
+Subscriber = namedtuple(
+    "Subscriber",
+    ("token", "chat_id", "digest", "channels"),
+    defaults=(False, ("telegram",)),
+)
+
+
+def load_subscribers(path):
+    """
+    Читает подписчиков из JSON-файла вида
+    [{"token": "...", "chat_id": "...", "digest": false,
+      "channels": ["telegram"]}, ...].
+    С "digest": true изменения приходят в чат сводками;
+    "channels" — каналы доставки: telegram, webhook, file.
+    Вместо "token" можно указать список "tokens" (групповой чат
+    следит за всей когортой), вместо "chat_id" — список "chat_ids"
+    (личный и групповой чат студента).
+    """
+    with open(path, encoding="UTF-8") as file:
+        data = json.load(file)
+    if not isinstance(data, list):
+        raise TypeError("Файл подписчиков должен содержать список")
+    subscribers = []
+    for item in data:
+        tokens = item["tokens"] if "tokens" in item else [item["token"]]
+        chats = item["chat_ids"] if "chat_ids" in item else [item["chat_id"]]
+        subscribers.extend(
+            Subscriber(
+                str(token),
+                str(chat_id),
+                bool(item.get("digest", False)),
+                tuple(item.get("channels", ("telegram",))),
+            )
+            for token in tokens
+            for chat_id in chats
+        )
+    return subscribers
+
+
+class SubscriptionIndex:
+    """
+    Подписки «многие ко многим»: прямой индекс токен -> подписчики
+    (чаты) и обратный чат -> токены. Повторная пара (токен, чат)
+    учитывается один раз, побеждает последняя.
+    """
+
+    def __init__(self, subscribers=()):
+        self.by_token = {}
+        self.by_chat = {}
+        self.load(subscribers)
+
+    def load(self, subscribers):
+        """Перестраивает оба индекса по списку Subscriber."""
+        by_token = {}
+        for subscriber in subscribers:
+            chats = by_token.setdefault(subscriber.token, {})
+            chats[subscriber.chat_id] = subscriber
+        by_chat = {}
+        for token, chats in by_token.items():
+            for chat_id in chats:
+                by_chat.setdefault(chat_id, []).append(token)
+        self.by_token = {
+            token: tuple(chats.values()) for token, chats in by_token.items()
+        }
+        self.by_chat = {
+            chat_id: tuple(tokens) for chat_id, tokens in by_chat.items()
+        }
+
+    def followers(self, token):
+        """Подписчики (чаты), следящие за `token`."""
+        return self.by_token.get(token, ())
+
+    def tokens_for(self, chat_id):
+        """Токены, на которые подписан чат `chat_id`."""
+        return self.by_chat.get(chat_id, ())
+
+    def __len__(self):
+        return sum(map(len, self.by_token.values()))
+
+    def __iter__(self):
+        for followers in self.by_token.values():
+            yield from followers
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from batch import BatchFetcher
+from exceptions import Not200Response
+from subscribers import Subscriber
+
+SUBSCRIBERS = [Subscriber(f"token{i}", str(i)) for i in range(6)]
+
+
+def fetch_one(token, fromdate):
+    if token == "token3":
+        raise Not200Response("Ответ сервера не 200, a 401")
+    return {"homeworks": [], "current_date": fromdate}
+
+
+@pytest.fixture
+def due():
+    return [(subscriber, 100) for subscriber in SUBSCRIBERS]
+
+
+def test_bad_token_does_not_fail_batch(due):
+    fetcher = BatchFetcher(fetch_one, max_in_flight=3)
+    results = {r.subscriber.token: r for r in fetcher.fetch(due)}
+    fetcher.close()
+    assert len(results) == len(SUBSCRIBERS)
+    with pytest.raises(Not200Response):
+        results["token3"].unwrap()
+    assert results["token0"].unwrap() == {
+        "homeworks": [], "current_date": 100
+    }
+
+
+def test_in_flight_cap(due):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_fetch(token, fromdate):
+        with lock:
+            active.append(token)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.remove(token)
+        return {}
+
+    fetcher = BatchFetcher(slow_fetch, max_in_flight=2)
+    list(fetcher.fetch(due))
+    fetcher.close()
+    assert max(peak) <= 2
+
+
+def test_failed_batch_split_down_to_single_requests(due):
+    calls = []
+
+    def fetch_many(chunk):
+        calls.append(len(chunk))
+        if any(subscriber.token == "token3" for subscriber, _ in chunk):
+            raise ConnectionError("пакет отклонён")
+        return {subscriber.token: {} for subscriber, _ in chunk}
+
+    fetcher = BatchFetcher(fetch_one, fetch_many, batch_size=6)
+    results = list(fetcher.fetch(due))
+    fetcher.close()
+    assert calls[0] == 6
+    errors = [r.subscriber.token for r in results if r.error]
+    assert errors == ["token3"]
+    assert len(results) == len(SUBSCRIBERS)
+
+
+def test_close_cancels_queued_requests(due):
+    calls = []
+
+    def slow(token, fromdate):
+        calls.append(token)
+        time.sleep(0.05)
+        return {"homeworks": [], "current_date": fromdate}
+
+    fetcher = BatchFetcher(slow, max_in_flight=1)
+    results = fetcher.fetch(due)
+    next(results)
+    results.close()
+    started = time.monotonic()
+    fetcher.close(timeout=5)
+    assert time.monotonic() - started < 0.2
+    assert len(calls) < len(due)
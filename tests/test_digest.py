@@ -0,0 +1,86 @@
+from digest import Digest, split_message
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_messages_batched_until_window_ends():
+    clock = FakeClock()
+    digest = Digest(window=60, clock=clock)
+    sent = []
+
+    def send(channels, chat, text):
+        sent.append((chat, text))
+        return True
+
+    for index in range(5):
+        digest.add("chat", f"статус {index}")
+    digest.flush(send)
+    assert sent == []
+    clock.now = 60
+    digest.flush(send)
+    assert len(sent) == 1
+    assert sent[0][1].startswith("Сводка изменений статусов (5):")
+    assert digest.pending() == 0
+
+
+def test_split_respects_limit_and_lines():
+    lines = ["a" * 30, "b" * 30, "c" * 30]
+    assert split_message(lines, limit=62) == [
+        "a" * 30 + "\n" + "b" * 30, "c" * 30
+    ]
+    assert split_message(["x" * 25], limit=10) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_long_digest_split_into_several_messages():
+    digest = Digest(window=0)
+    for index in range(200):
+        digest.add("chat", f"Изменился статус проверки работы {index}. " * 3)
+    sent = []
+    digest.flush(lambda channels, chat, text: sent.append(text) or True)
+    assert len(sent) > 1
+    assert all(len(text) <= 4096 for text in sent)
+    assert sum(text.count("•") for text in sent) == 200
+
+
+def test_failed_chunk_requeued():
+    digest = Digest(window=0)
+    for index in range(200):
+        digest.add("chat", f"сообщение {index} " * 10)
+    calls = []
+
+    def send(channels, chat, text):
+        calls.append(text)
+        return len(calls) == 1
+
+    digest.flush(send)
+    delivered = calls[0].count("•")
+    assert digest.pending() == 200 - delivered
+
+
+def test_digest_goes_to_chat_channels():
+    digest = Digest(window=0)
+    digest.add("chat", "первое", channels=("webhook",))
+    digest.add("chat", "второе", channels=("telegram", "webhook"))
+    sent = []
+    digest.flush(lambda channels, chat, text: sent.append(channels) or True)
+    assert sent == [("webhook", "telegram")]
+
+
+def test_digest_requeued_only_for_channels_that_refused():
+    digest = Digest(window=0)
+    digest.add("chat", "статус", channels=("telegram", "file"))
+    sent = []
+
+    def send(channels, chat, text):
+        sent.append(channels)
+        return ("file",)
+
+    digest.flush(send)
+    digest.flush(send)
+    assert sent == [("telegram", "file"), ("telegram",)]
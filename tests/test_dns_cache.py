@@ -0,0 +1,102 @@
+import socket
+
+import pytest
+
+import homework
+from dns_cache import DnsCache
+
+ADDRESS = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", 443))]
+
+
+class StubResolver:
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self, host, port, family, type, proto, flags):
+        self.calls += 1
+        if self.fail:
+            raise socket.gaierror("resolver down")
+        return ADDRESS, self.ttl
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_entry_cached_until_ttl(clock):
+    resolver = StubResolver(ttl=60)
+    cache = DnsCache(["api.example"], resolve=resolver, clock=clock)
+    assert cache.getaddrinfo("api.example", 443) == ADDRESS
+    clock.now = 59
+    cache.getaddrinfo("api.example", 443)
+    assert resolver.calls == 1
+    clock.now = 61
+    cache.getaddrinfo("api.example", 443)
+    assert resolver.calls == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_default_ttl_when_resolver_has_none(clock):
+    resolver = StubResolver(ttl=None)
+    cache = DnsCache(["api.example"], ttl=10, resolve=resolver, clock=clock)
+    cache.getaddrinfo("api.example", 443)
+    clock.now = 11
+    cache.getaddrinfo("api.example", 443)
+    assert resolver.calls == 2
+
+
+def test_stale_entry_served_on_failure(clock):
+    resolver = StubResolver(ttl=1)
+    cache = DnsCache(["api.example"], resolve=resolver, clock=clock)
+    cache.getaddrinfo("api.example", 443)
+    clock.now = 100
+    resolver.fail = True
+    assert cache.getaddrinfo("api.example", 443) == ADDRESS
+    assert cache.stale == 1
+    with pytest.raises(socket.gaierror):
+        cache.getaddrinfo("api.example", 80)
+
+
+def test_install_routes_only_listed_hosts():
+    resolver = StubResolver()
+    cache = DnsCache(["api.example"], resolve=resolver)
+    cache.install()
+    try:
+        assert socket.getaddrinfo("api.example", 443) == ADDRESS
+        assert socket.getaddrinfo("127.0.0.1", 80)
+    finally:
+        cache.uninstall()
+    assert resolver.calls == 1
+
+
+def test_prewarm_resolves_without_connecting(clock, monkeypatch):
+    def no_socket(*args, **kwargs):
+        raise AssertionError("prewarm не должен открывать соединения")
+
+    monkeypatch.setattr(socket, "socket", no_socket)
+    resolver = StubResolver()
+    cache = DnsCache(["api.example"], resolve=resolver, clock=clock)
+    cache.prewarm()
+    # так же спрашивает адрес urllib3 при открытии соединения
+    cache.getaddrinfo("api.example", 443, 0, socket.SOCK_STREAM)
+    assert (resolver.calls, cache.hits) == (1, 1)
+
+
+def test_warm_up_off_by_default(monkeypatch):
+    class Bot:
+        def get_me(self, timeout=None):
+            raise AssertionError("сеть в тестах")
+
+    monkeypatch.setattr(DnsCache, "prewarm", Bot.get_me)
+    dns = homework.warm_up(Bot())
+    dns.uninstall()
@@ -0,0 +1,73 @@
+import json
+
+import homework
+from interning import Interner, intern_homework
+
+LESSON = "Спринт 7. Проект: Kittygram"
+
+
+def test_equal_strings_share_one_object():
+    intern = Interner()
+    first = json.loads(json.dumps({"lesson_name": LESSON}))
+    second = json.loads(json.dumps({"lesson_name": LESSON}))
+    assert first["lesson_name"] is not second["lesson_name"]
+    assert intern_homework(first, intern)["lesson_name"] is (
+        intern_homework(second, intern)["lesson_name"]
+    )
+
+
+def test_table_size_is_bounded():
+    intern = Interner(max_entries=2)
+    for value in ("a", "b", "c", "d"):
+        intern(value)
+    assert len(intern) == 2
+    assert intern(None) is None
+
+
+def test_poll_keeps_interned_homework_in_state():
+    response = {
+        "homeworks": [
+            {"homework_name": "hw", "status": "approved",
+             "lesson_name": LESSON}
+        ],
+        "current_date": 5,
+    }
+    states = [
+        homework.poll_homeworks(
+            lambda fromdate: json.loads(json.dumps(response)),
+            lambda message: True,
+            homework.new_state(0),
+        )
+        for _ in range(2)
+    ]
+    first, second = (state["homework"] for state in states)
+    assert first["lesson_name"] is second["lesson_name"]
+    assert states[0]["prev_report"]["status"] is (
+        states[1]["prev_report"]["status"]
+    )
+    assert states[0]["prev_report"]["name"] is first["homework_name"]
+
+
+def test_student_names_not_interned():
+    intern = Interner()
+    intern_homework({"homework_name": "student1__hw05.zip"}, intern)
+    assert len(intern) == 0
+
+
+def test_old_report_upgraded_without_resending():
+    old = homework.new_state(0)
+    old["prev_report"] = {
+        "name": "hw",
+        "messages": 'Изменился статус проверки работы "hw". '
+        + homework.HOMEWORK_VERDICTS["approved"],
+    }
+    response = {
+        "homeworks": [{"homework_name": "hw", "status": "approved"}],
+        "current_date": 5,
+    }
+    sent = []
+    state = homework.poll_homeworks(
+        lambda fromdate: response, sent.append, old
+    )
+    assert sent == []
+    assert state["prev_report"] == {"name": "hw", "status": "approved"}
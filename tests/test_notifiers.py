@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+
+from notifiers import Channel, FanOut, FileNotifier
+
+
+class RecordingNotifier:
+    def __init__(self, name, gate=None):
+        self.name = name
+        self.gate = gate
+        self.messages = []
+
+    def send(self, target, message):
+        if self.gate:
+            self.gate.wait(5)
+        self.messages.append((target, message))
+        return True
+
+
+def test_slow_channel_does_not_stall_others():
+    gate = threading.Event()
+    slow = RecordingNotifier("slow", gate)
+    fast = RecordingNotifier("fast")
+    fanout = FanOut([slow, fast], queue_size=10, workers=1)
+    for index in range(5):
+        assert fanout.deliver(("slow", "fast"), "chat", f"msg {index}")
+    fanout.channels["fast"].close(timeout=5)
+    assert len(fast.messages) == 5
+    assert slow.messages == []
+    gate.set()
+    fanout.close(timeout=5)
+    assert len(slow.messages) == 5
+
+
+def test_full_queue_drops_instead_of_blocking():
+    gate = threading.Event()
+    channel = Channel(RecordingNotifier("slow", gate), queue_size=2, workers=1)
+    accepted = [channel.submit("chat", str(index)) for index in range(10)]
+    assert accepted.count(False) == channel.dropped > 0
+    gate.set()
+    channel.close(timeout=5)
+    assert channel.stats()["sent"] == accepted.count(True)
+
+
+def test_unknown_channel_skipped():
+    fanout = FanOut([RecordingNotifier("telegram")], workers=1)
+    assert fanout.deliver(("telegram", "sms"), "chat", "text")
+    assert not fanout.deliver(("sms",), "chat", "text")
+    fanout.close(timeout=5)
+
+
+def test_file_notifier(tmp_path):
+    path = tmp_path / "out.jsonl"
+    assert FileNotifier(str(path)).send("chat", "Работа проверена")
+    event = json.loads(path.read_text(encoding="UTF-8"))
+    assert event["target"] == "chat"
+    assert event["text"] == "Работа проверена"
+
+
+def test_newer_status_supersedes_pending():
+    gate = threading.Event()
+    notifier = RecordingNotifier("slow", gate)
+    channel = Channel(notifier, queue_size=10, workers=1)
+    channel.submit("busy", "blocks the worker")
+    while channel.stats()["queued"]:
+        pass
+    for status in ("reviewing", "rejected", "approved"):
+        assert channel.submit("chat", status, key=("chat", 1))
+    assert channel.submit("chat", "other work", key=("chat", 2))
+    gate.set()
+    channel.close(timeout=5)
+    assert notifier.messages[1:] == [
+        ("chat", "approved"), ("chat", "other work")
+    ]
+    assert channel.stats()["superseded"] == 2
+
+
+def test_keep_history_sends_every_status():
+    gate = threading.Event()
+    notifier = RecordingNotifier("slow", gate)
+    channel = Channel(notifier, queue_size=10, workers=1, keep_history=True)
+    for status in ("reviewing", "rejected", "approved"):
+        channel.submit("chat", status, key=("chat", 1))
+    gate.set()
+    channel.close(timeout=5)
+    assert [text for _, text in notifier.messages] == [
+        "reviewing", "rejected", "approved"
+    ]
+
+
+class FlakyNotifier(RecordingNotifier):
+    def __init__(self, name, failures):
+        super().__init__(name)
+        self.failures = failures
+
+    def send(self, target, message):
+        if self.failures:
+            self.failures -= 1
+            return False
+        return super().send(target, message)
+
+
+def test_failed_send_retried_with_backoff():
+    notifier = FlakyNotifier("flaky", failures=2)
+    channel = Channel(notifier, workers=1, retries=3, retry_delay=0)
+    assert channel.submit("chat", "approved", key=("chat", 1))
+    channel.close(timeout=5)
+    assert notifier.messages == [("chat", "approved")]
+    stats = channel.stats()
+    assert (stats["sent"], stats["failed"], stats["retried"]) == (1, 0, 2)
+
+
+def test_send_fails_after_last_attempt():
+    notifier = FlakyNotifier("flaky", failures=5)
+    channel = Channel(notifier, workers=1, retries=2, retry_delay=0)
+    channel.submit("chat", "approved")
+    channel.close(timeout=5)
+    assert notifier.messages == []
+    assert channel.stats()["failed"] == 1
+
+
+def test_close_shares_one_deadline_and_counts_leftovers():
+    gate = threading.Event()
+    slow = [RecordingNotifier(name, gate) for name in ("first", "second")]
+    fanout = FanOut(slow, queue_size=10, workers=1)
+    for index in range(3):
+        fanout.deliver(("first", "second"), "chat", f"msg {index}")
+    started = time.monotonic()
+    fanout.close(timeout=0.3)
+    assert time.monotonic() - started < 0.5
+    stats = fanout.stats()
+    assert stats["first"]["dropped"] == stats["second"]["dropped"] == 2
+    gate.set()
+
+
+def test_close_does_not_wait_for_late_retry():
+    notifier = FlakyNotifier("flaky", failures=5)
+    channel = Channel(notifier, workers=2, retries=3, retry_delay=60)
+    channel.submit("chat", "approved")
+    while not channel.stats()["retrying"]:
+        time.sleep(0.01)
+    started = time.monotonic()
+    channel.close(timeout=5)
+    assert time.monotonic() - started < 1
+    assert channel.stats()["dropped"] == 1
+
+
+def test_deliver_reports_accepting_channels():
+    gate = threading.Event()
+    full = RecordingNotifier("telegram", gate)
+    fanout = FanOut([full, RecordingNotifier("file")], queue_size=1,
+                    workers=1)
+    fanout.deliver(("telegram",), "busy", "blocks the worker")
+    while fanout.stats()["telegram"]["queued"]:
+        pass
+    fanout.deliver(("telegram",), "chat", "fills the queue")
+    assert fanout.deliver(("telegram", "file"), "chat", "new") == ("file",)
+    left = fanout.close(timeout=0.1)
+    assert ("telegram", "chat", "fills the queue") in left
+    gate.set()
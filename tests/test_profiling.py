@@ -0,0 +1,57 @@
+import os
+import pstats
+import signal
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from profiling import Profiler
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = Profiler(str(tmp_path))
+    profiler.install()
+    yield profiler
+    profiler.restore()
+
+
+def test_cpu_profile_dumped_on_second_signal(profiler, tmp_path):
+    os.kill(os.getpid(), signal.SIGUSR1)
+    sum(range(1000))
+    os.kill(os.getpid(), signal.SIGUSR1)
+    (path,) = tmp_path.glob("cpu-*.prof")
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+def test_memory_snapshot_dumped_on_second_signal(profiler, tmp_path):
+    os.kill(os.getpid(), signal.SIGUSR2)
+    assert tracemalloc.is_tracing()
+    os.kill(os.getpid(), signal.SIGUSR2)
+    assert not tracemalloc.is_tracing()
+    (path,) = tmp_path.glob("memory-*.snapshot")
+    assert tracemalloc.Snapshot.load(str(path))
+
+
+def test_worker_threads_sampled(profiler, tmp_path):
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_worker, name="fetch_0")
+    worker.start()
+    os.kill(os.getpid(), signal.SIGUSR1)
+    time.sleep(0.2)
+    os.kill(os.getpid(), signal.SIGUSR1)
+    stop.set()
+    worker.join()
+    (path,) = tmp_path.glob("cpu-*.folded")
+    stacks = path.read_text(encoding="UTF-8").splitlines()
+    assert any(
+        line.startswith("fetch_0;") and "busy_worker" in line
+        for line in stacks
+    )
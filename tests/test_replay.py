@@ -0,0 +1,109 @@
+from collections import Counter
+
+import homework
+from batch import BatchFetcher
+from recording import Recorder, scrub
+from replay import load_events, replay
+from scheduler import PollScheduler
+from subscribers import Subscriber, SubscriptionIndex
+
+ANSWERS = [
+    {"homeworks": [], "current_date": 10},
+    {"homeworks": [{"homework_name": "hw", "status": "reviewing"}],
+     "current_date": 20},
+    ConnectionError("Ответ сервера не 200, a 500"),
+    {"homeworks": [{"homework_name": "hw", "status": "approved"}],
+     "current_date": 30},
+]
+
+
+def record_session(path):
+    recorder = Recorder(str(path))
+    answers = iter(ANSWERS)
+
+    def fetch(fromdate):
+        answer = next(answers)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    fetch = recorder.fetch("secret-token", fetch)
+    notify = recorder.notify("12345", lambda message: True)
+    state = homework.new_state(0)
+    for _ in ANSWERS:
+        state = homework.poll_homeworks(fetch, notify, state)
+
+
+def test_record_scrubs_tokens(tmp_path):
+    path = tmp_path / "record.jsonl"
+    record_session(path)
+    text = path.read_text(encoding="UTF-8")
+    assert "secret-token" not in text
+    users = {e["user"] for e in load_events(path) if e["kind"] == "answer"}
+    assert users == {scrub("secret-token")}
+
+
+def test_replay_reproduces_sends(tmp_path):
+    path = tmp_path / "record.jsonl"
+    record_session(path)
+    report = replay(load_events(path))
+    assert report.polls == len(ANSWERS)
+    assert len(report.recorded) == 3
+    assert report.replayed == report.recorded
+
+
+def test_replay_fast_path_matches(tmp_path):
+    path = tmp_path / "record.jsonl"
+    record_session(path)
+    report = replay(load_events(path), fast_path=True)
+    assert report.replayed == report.recorded
+
+
+class AcceptingFanOut:
+    def deliver(self, channels, target, message, key=None):
+        return True
+
+
+def test_replay_sends_to_every_recorded_chat(tmp_path, monkeypatch):
+    path = tmp_path / "record.jsonl"
+    recorder = Recorder(str(path))
+    index = SubscriptionIndex([
+        Subscriber("token", "personal"),
+        Subscriber("token", "group"),
+    ])
+    monkeypatch.setattr(homework, "RECORDER", recorder)
+    monkeypatch.setattr(homework, "SUBSCRIPTIONS", index)
+    monkeypatch.setattr(homework, "SCHEDULER", PollScheduler(600, 600))
+    fetcher = BatchFetcher(
+        recorder.fetch_for(
+            lambda token, fromdate: ANSWERS[1],
+            chats=homework.follower_chats,
+        ),
+        max_in_flight=1,
+    )
+    homework.check_subscribers(AcceptingFanOut(), fetcher, {})
+    fetcher.close()
+
+    report = replay(load_events(path))
+    assert len(report.recorded) == 2
+    assert Counter(report.replayed) == Counter(report.recorded)
+
+
+def test_failing_fetch_recorded_without_token(tmp_path):
+    path = tmp_path / "record.jsonl"
+    recorder = Recorder(str(path))
+
+    def fetch(fromdate):
+        raise ConnectionError(
+            "Ошибка: refused {'Authorization': 'OAuth secretTOKEN123'}"
+        )
+
+    fetch = recorder.fetch("secretTOKEN123", fetch)
+    notify = recorder.notify("12345", lambda message: True)
+    homework.poll_homeworks(fetch, notify, homework.new_state(0))
+
+    text = path.read_text(encoding="UTF-8")
+    assert "secretTOKEN123" not in text
+    assert scrub("secretTOKEN123") in text
+    report = replay(load_events(path))
+    assert report.replayed == report.recorded
@@ -0,0 +1,62 @@
+import pytest
+
+import homework
+from exceptions import EmptyAnswerAPI
+from results import Err, Ok
+
+HOMEWORK = {"homework_name": "hw123", "status": "approved"}
+
+
+@pytest.mark.parametrize("response, exception", [
+    ([], TypeError),
+    ({"current_date": 1}, EmptyAnswerAPI),
+    ({"homeworks": {}}, TypeError),
+])
+def test_check_response_result_matches_raising_api(response, exception):
+    result = homework.check_response_result(response)
+    assert isinstance(result, Err)
+    with pytest.raises(exception):
+        homework.check_response(response)
+
+
+@pytest.mark.parametrize("item, exception", [
+    ({"homework_name": "hw123", "status": "unknown"}, ValueError),
+    ({"status": "approved"}, KeyError),
+])
+def test_parse_status_result_errors(item, exception):
+    assert not homework.parse_status_result(item).ok
+    with pytest.raises(exception):
+        homework.parse_status(item)
+
+
+def test_valid_response_ok():
+    result = homework.check_response_result({"homeworks": [HOMEWORK]})
+    assert result == Ok([HOMEWORK])
+    assert homework.parse_status_result(HOMEWORK).value == (
+        homework.parse_status(HOMEWORK)
+    )
+
+
+def test_fast_poll_sends_once_and_reports_failure_once():
+    sent = []
+    state = homework.new_state(0)
+
+    def fetch(fromdate):
+        return Ok({"homeworks": [HOMEWORK], "current_date": 10})
+
+    def notify(message):
+        sent.append(message)
+        return True
+
+    state = homework.poll_homeworks_fast(fetch, notify, state)
+    state = homework.poll_homeworks_fast(fetch, notify, state)
+    assert len(sent) == 1
+    assert state["fromdate"] == 10
+
+    def broken(fromdate):
+        return Err("not_200", "Ответ сервера не 200, a 500")
+
+    state = homework.poll_homeworks_fast(broken, notify, state)
+    state = homework.poll_homeworks_fast(broken, notify, state)
+    assert len(sent) == 2
+    assert sent[-1].startswith("Сбой в работе программы")
@@ -0,0 +1,76 @@
+from scheduler import PollScheduler, percentiles
+from simulate import simulate
+
+HOUR = 60 * 60
+
+
+def state(status=None, date_updated=None, name="hw"):
+    homework = None
+    if status:
+        homework = {"status": status, "date_updated": date_updated}
+    return {
+        "fromdate": 0,
+        "prev_report": {"name": name, "messages": status},
+        "homework": homework,
+    }
+
+
+def test_hot_polls_go_first_and_cold_are_deferred():
+    scheduler = PollScheduler(slo=600, period=600, idle_interval=6 * HOUR,
+                              capacity=2)
+    now = 100 * HOUR
+    states = {
+        "cold": state("approved", "1970-01-02T00:00:00Z"),
+        "reviewing": state("reviewing"),
+        "recent": state("rejected", now - HOUR),
+    }
+    polled = {
+        "cold": now - 6 * HOUR + 300,
+        "reviewing": now - 600,
+        "recent": now - 900,
+    }
+    for key, polled_at in polled.items():
+        scheduler.observe(key, states[key], states[key], polled_at)
+
+    assert scheduler.select(states.keys(), now) == ["recent", "reviewing"]
+    assert scheduler.deferred == 1
+
+    scheduler.observe("cold", states["cold"], states["cold"], now - 5 * HOUR)
+    scheduler.capacity = None
+    assert scheduler.select(states.keys(), now) == ["recent", "reviewing"]
+    assert scheduler.select(states.keys(), now + HOUR) == [
+        "recent", "reviewing", "cold"
+    ]
+
+
+def test_new_keys_due_at_once_and_removed_forgotten():
+    scheduler = PollScheduler(slo=600, period=600)
+    assert scheduler.select({"a", "b"}, 1000) == ["a", "b"]
+    scheduler.observe("a", state(), state(), 1000)
+    assert scheduler.select({"a", "b"}, 1000) == ["b"]
+    assert scheduler.select({"a"}, 1600) == ["a"]
+    assert "b" not in scheduler.schedule
+
+
+def test_time_to_notify_recorded_on_send():
+    scheduler = PollScheduler(slo=600, period=600)
+    before = state()
+    after = state("approved", 1000, name="hw")
+    scheduler.observe("user", before, after, 1300)
+    scheduler.observe("user", after, after, 1900)
+
+    assert scheduler.schedule["user"] == (2500, True)
+    assert scheduler.user_percentiles("user") == {50: 300, 90: 300, 99: 300}
+    assert scheduler.report()["users_within_slo"] == 1.0
+
+
+def test_percentiles():
+    assert percentiles(range(1, 101)) == {50: 50, 90: 90, 99: 99}
+    assert percentiles([], (50,)) == {50: None}
+
+
+def test_simulation_under_capacity_limit():
+    report = simulate(users=100, days=2, seed=5, capacity=30,
+                      idle_interval=6 * HOUR)
+    assert report.scheduler["deferred"] > 0
+    assert report.scheduler["time_to_notify"][50] < 2 * 600
@@ -0,0 +1,63 @@
+import json
+import os
+
+import homework
+from results import NO_HOMEWORKS, NOT_DICT, NOT_LIST
+from schema import MISSING, WRONG_TYPE, BAD_FORMAT, validate_response
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_captured_payload_is_valid_and_normalized():
+    with open(os.path.join(BASE_DIR, "test.json"), encoding="UTF-8") as file:
+        payload = json.load(file)
+    value, errors = validate_response(payload)
+    assert errors == []
+    assert len(value["homeworks"]) == len(payload["homeworks"])
+    first = value["homeworks"][0]
+    assert isinstance(first["date_updated"], int)
+    assert "reviewer_comment" not in first
+
+
+def test_all_field_errors_reported_in_one_pass():
+    payload = {
+        "homeworks": [
+            {"id": "1", "status": "approved", "homework_name": "hw"},
+            {"status": "approved", "date_updated": "вчера"},
+            "не словарь",
+        ],
+        "current_date": 1,
+    }
+    value, errors = validate_response(payload)
+    assert [(e.path, e.problem) for e in errors] == [
+        ("homeworks[0].id", WRONG_TYPE),
+        ("homeworks[1].homework_name", MISSING),
+        ("homeworks[1].date_updated", BAD_FORMAT),
+        ("homeworks[2]", WRONG_TYPE),
+    ]
+    assert str(errors[1]) == "homeworks[1].homework_name: поле отсутствует"
+
+
+def test_top_level_errors_map_to_check_response_errors():
+    assert homework.validate_response_result([]) is NOT_DICT
+    assert homework.validate_response_result({}) is NO_HOMEWORKS
+    assert homework.validate_response_result({"homeworks": {}}) is NOT_LIST
+    result = homework.validate_response_result(
+        {"homeworks": [{"status": "approved"}]}
+    )
+    assert result.kind == "invalid_schema"
+
+
+def test_fast_path_checks_only_reported_homework():
+    payload = {
+        "homeworks": [
+            {"id": 2, "status": "approved", "homework_name": "hw2"},
+            {"id": "старый", "status": "approved"},
+        ],
+        "current_date": 1,
+    }
+    value, errors = validate_response(payload, limit=1)
+    assert errors == []
+    assert [item["id"] for item in value["homeworks"]] == [2]
+    result = homework.validate_response_result(payload)
+    assert result.ok and result.value[0]["homework_name"] == "hw2"
@@ -0,0 +1,61 @@
+import os
+import signal
+import time
+
+import pytest
+
+from exceptions import ShutdownRequested
+from shutdown import Lifecycle
+
+
+@pytest.fixture
+def lifecycle():
+    reloads = []
+    lifecycle = Lifecycle(deadline=1, on_reload=lambda: reloads.append(1))
+    lifecycle.reloads = reloads
+    lifecycle.install()
+    yield lifecycle
+    lifecycle.restore()
+
+
+def test_sigterm_interrupts_sleep(lifecycle):
+    with pytest.raises(ShutdownRequested):
+        with lifecycle.idle():
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(5)
+    assert lifecycle.stopping
+
+
+def test_sigterm_while_busy_lets_cycle_finish(lifecycle):
+    os.kill(os.getpid(), signal.SIGTERM)
+    assert lifecycle.stopping
+    with pytest.raises(ShutdownRequested):
+        with lifecycle.idle():
+            pass
+
+
+def test_sigterm_while_busy_forced_after_deadline(lifecycle):
+    os.kill(os.getpid(), signal.SIGTERM)
+    with pytest.raises(ShutdownRequested):
+        time.sleep(5)
+
+
+def test_sighup_deferred_while_busy(lifecycle):
+    os.kill(os.getpid(), signal.SIGHUP)
+    assert lifecycle.reloads == []
+    lifecycle.apply_pending_reload()
+    assert lifecycle.reloads == [1]
+
+
+def test_sighup_applied_immediately_while_idle(lifecycle):
+    with lifecycle.idle():
+        os.kill(os.getpid(), signal.SIGHUP)
+    assert lifecycle.reloads == [1]
+
+
+def test_stop_deadline_shared_by_shutdown_steps(lifecycle):
+    os.kill(os.getpid(), signal.SIGTERM)
+    signal.alarm(0)
+    first = lifecycle.time_left()
+    time.sleep(0.05)
+    assert 0 < lifecycle.time_left() <= first - 0.05
@@ -0,0 +1,45 @@
+import homework
+from clock import SystemClock, VirtualClock
+from simulate import simulate
+
+
+def test_virtual_clock_does_not_wait():
+    clock = VirtualClock(100)
+    clock.sleep(600)
+    clock.advance_to(50)
+    assert clock.time() == clock.monotonic() == 700
+    assert clock.slept == 600
+
+
+def test_simulation_is_deterministic():
+    first = simulate(users=50, days=2, seed=7)
+    second = simulate(users=50, days=2, seed=7, fast_path=True)
+    assert first[:5] == second[:5]
+    assert first.polls == 50 * 2 * 144
+    assert isinstance(homework.CLOCK, SystemClock)
+
+
+def test_every_change_reported_within_retry_period():
+    report = simulate(users=20, days=2, seed=3, retry_period=600)
+    latencies = [
+        value for values in report.latencies.values() for value in values
+    ]
+    assert 0 < report.notifications <= report.changes
+    assert max(latencies) < 600
+
+
+def test_simulation_runs_the_bot_cycle(monkeypatch):
+    cycles = []
+    check_subscribers = homework.check_subscribers
+
+    def counted(fanout, fetcher, state):
+        cycles.append(len(state))
+        return check_subscribers(fanout, fetcher, state)
+
+    monkeypatch.setattr(homework, "check_subscribers", counted)
+    subscriptions = homework.SUBSCRIPTIONS
+    report = simulate(users=5, days=1, seed=2)
+    assert len(cycles) == 144
+    assert cycles[-1] == 5
+    assert report.polls == 5 * 144
+    assert homework.SUBSCRIPTIONS is subscriptions
@@ -0,0 +1,108 @@
+import json
+
+from snapshot import Snapshot, SnapshotState, write_snapshot
+from state_store import StateStore
+
+
+def state(fromdate):
+    return {"fromdate": fromdate, "prev_report": {"name": None}}
+
+
+def test_write_and_lookup(tmp_path):
+    path = str(tmp_path / "state.snap")
+    write_snapshot(path, [
+        (f"token{i}", json.dumps(state(i)).encode()) for i in range(100)
+    ])
+    snapshot = Snapshot(path)
+    assert len(snapshot) == 100
+    index = snapshot.find("token42")
+    assert snapshot.key(index) == "token42"
+    assert json.loads(snapshot.raw_value(index)) == state(42)
+    assert snapshot.find("missing") is None
+    snapshot.close()
+
+
+def test_lazy_decode_and_checkpoint_roundtrip(tmp_path):
+    path = str(tmp_path / "state.snap")
+    decoded = []
+
+    def decode(raw):
+        decoded.append(raw)
+        return json.loads(raw)
+
+    first = SnapshotState(path)
+    for i in range(10):
+        first[f"token{i}"] = state(i)
+    first.close()
+
+    second = SnapshotState(path, decode=decode)
+    assert len(second) == 10
+    assert decoded == []
+    assert second["token3"] == state(3)
+    assert len(decoded) == 1
+    second["token3"] = state(33)
+    second["token10"] = state(10)
+    del second["token0"]
+    second.close()
+
+    third = SnapshotState(path)
+    assert dict(third) == {
+        **{f"token{i}": state(i) for i in range(1, 10)},
+        "token3": state(33),
+        "token10": state(10),
+    }
+    third.close()
+
+
+def test_corrupt_snapshot_ignored(tmp_path):
+    path = tmp_path / "state.snap"
+    path.write_bytes(b"not a snapshot at all")
+    restored = SnapshotState(str(path))
+    assert len(restored) == 0
+
+
+def test_checkpoint_encodes_only_changed_records(tmp_path):
+    path = str(tmp_path / "state.snap")
+    first = SnapshotState(path)
+    for i in range(10):
+        first[f"token{i}"] = state(i)
+    first.close()
+
+    base = StateStore(str(tmp_path / "cold"), max_resident=2)
+    second = SnapshotState(path, base)
+    for i in range(5):
+        second[f"token{i}"]
+    second["token7"] = state(77)
+    before = base.stats()
+    second.checkpoint(force=True)
+    assert base.stats() == before
+    second.close()
+
+    third = SnapshotState(path)
+    assert dict(third) == {
+        **{f"token{i}": state(i) for i in range(10)},
+        "token7": state(77),
+    }
+    third.close()
+
+
+class CountingBase(dict):
+    walks = 0
+
+    def __iter__(self):
+        CountingBase.walks += 1
+        return super().__iter__()
+
+
+def test_startup_does_not_walk_base(tmp_path):
+    path = str(tmp_path / "state.snap")
+    base = CountingBase(token1=state(1))
+    restored = SnapshotState(path, base)
+    assert CountingBase.walks == 0
+    restored["token2"] = state(2)
+    restored.checkpoint(force=True)
+    restored.close()
+
+    reopened = SnapshotState(path)
+    assert dict(reopened) == {"token1": state(1), "token2": state(2)}
+    reopened.close()
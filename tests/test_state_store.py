@@ -0,0 +1,62 @@
+import pytest
+
+import state_store
+from state_store import RSS_CHECK_EVERY, StateStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = StateStore(str(tmp_path / "cold"), max_resident=2)
+    yield store
+    store.close()
+
+
+def test_lru_eviction_and_fault_in(store):
+    for key in "abc":
+        store[key] = {"fromdate": ord(key)}
+    assert store.stats()["resident"] == 2
+    assert store.evictions == 1
+    assert store["a"] == {"fromdate": ord("a")}
+    assert store.misses == 1
+    assert store["a"]["fromdate"] == ord("a")
+    assert store.hits == 1
+    assert len(store) == 3
+    assert sorted(store) == ["a", "b", "c"]
+
+
+def test_setdefault_and_dict_conversion(store):
+    store.setdefault("a", {"fromdate": 1})
+    store.setdefault("b", {"fromdate": 2})
+    store.setdefault("c", {"fromdate": 3})
+    assert store.setdefault("a", {"fromdate": 0}) == {"fromdate": 1}
+    assert dict(store) == {
+        "a": {"fromdate": 1}, "b": {"fromdate": 2}, "c": {"fromdate": 3}
+    }
+    assert "missing" not in store
+
+
+def test_cold_entries_survive_reopen(tmp_path):
+    path = str(tmp_path / "cold")
+    store = StateStore(path, max_resident=1)
+    store["a"] = {"fromdate": 1}
+    store["b"] = {"fromdate": 2}
+    store.close()
+    reopened = StateStore(path, max_resident=1)
+    assert reopened["a"] == {"fromdate": 1}
+    assert reopened["b"] == {"fromdate": 2}
+    reopened.close()
+
+
+def test_rss_budget_stops_shrinking_when_rss_does_not_fall(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(state_store, "current_rss", lambda: 2**30)
+    store = StateStore(str(tmp_path / "cold"))
+    for index in range(1000):
+        store[str(index)] = {"fromdate": index}
+    store.max_rss = 2**20
+    for index in range(RSS_CHECK_EVERY * 20):
+        store[str(index % 1000)] = {"fromdate": index}
+    assert store.rss_resident == 900
+    assert store.stats()["resident"] == 900
+    store.close()
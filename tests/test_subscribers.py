@@ -0,0 +1,255 @@
+import json
+from contextlib import contextmanager
+
+import homework
+from batch import BatchFetcher
+from exceptions import StageTimeout
+from scheduler import PollScheduler
+from snapshot import SnapshotState
+from subscribers import Subscriber, SubscriptionIndex, load_subscribers
+
+RESPONSE = {
+    "homeworks": [
+        {"id": 1, "homework_name": "hw", "status": "approved"}
+    ],
+    "current_date": 20,
+}
+
+
+class FakeFanOut:
+    def __init__(self):
+        self.delivered = []
+
+    def deliver(self, channels, target, message, key=None):
+        self.delivered.append((target, key))
+        return True
+
+    def submit(self, channel, target, message, key=None):
+        return True
+
+
+def test_load_expands_tokens_and_chats(tmp_path):
+    path = tmp_path / "subscribers.json"
+    path.write_text(json.dumps([
+        {"tokens": ["a", "b"], "chat_id": "group"},
+        {"token": "a", "chat_ids": ["personal", "group"]},
+    ]))
+    index = SubscriptionIndex(load_subscribers(str(path)))
+
+    assert len(index) == 3
+    assert [s.chat_id for s in index.followers("a")] == ["group", "personal"]
+    assert index.tokens_for("group") == ("a", "b")
+    assert index.tokens_for("personal") == ("a",)
+    assert index.followers("unknown") == ()
+
+
+def test_token_fetched_once_for_all_chats(monkeypatch):
+    index = SubscriptionIndex([
+        Subscriber("a", "personal"),
+        Subscriber("a", "group"),
+        Subscriber("b", "group"),
+    ])
+    monkeypatch.setattr(homework, "SUBSCRIPTIONS", index)
+    monkeypatch.setattr(homework, "SCHEDULER", PollScheduler(600, 600))
+    calls = []
+
+    def fetch_one(token, fromdate):
+        calls.append(token)
+        return RESPONSE
+
+    fanout = FakeFanOut()
+    fetcher = BatchFetcher(fetch_one, max_in_flight=1)
+    state = homework.check_subscribers(fanout, fetcher, {})
+    fetcher.close()
+
+    assert sorted(calls) == ["a", "b"]
+    assert sorted(fanout.delivered) == [
+        ("group", ("group", 1)),
+        ("group", ("group", 1)),
+        ("personal", ("personal", 1)),
+    ]
+    assert state["a"]["fromdate"] == 20
+
+
+def test_chat_that_dropped_message_retried_next_cycle(monkeypatch):
+    index = SubscriptionIndex([
+        Subscriber("a", "personal"),
+        Subscriber("a", "group"),
+    ])
+    monkeypatch.setattr(homework, "SUBSCRIPTIONS", index)
+    scheduler = PollScheduler(1, 2, idle_interval=1)
+    monkeypatch.setattr(homework, "SCHEDULER", scheduler)
+    fanout = FakeFanOut()
+    full = {"group"}
+    deliver = fanout.deliver
+
+    def deliver_unless_full(channels, target, message, key=None):
+        if target in full:
+            return False
+        return deliver(channels, target, message, key)
+
+    monkeypatch.setattr(fanout, "deliver", deliver_unless_full)
+    fetcher = BatchFetcher(lambda token, fromdate: RESPONSE, max_in_flight=1)
+    state = homework.check_subscribers(fanout, fetcher, {})
+    assert fanout.delivered == [("personal", ("personal", 1))]
+    assert state["a"]["prev_report"]["name"] is None
+    assert state["a"]["delivered"]
+
+    full.clear()
+    state = homework.check_subscribers(fanout, fetcher, state)
+    fetcher.close()
+    assert fanout.delivered == [
+        ("personal", ("personal", 1)),
+        ("group", ("group", 1)),
+    ]
+    assert state["a"]["prev_report"]["name"] == "hw"
+    assert "delivered" not in state["a"]
+
+
+class TouchedState(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.touched = set()
+
+    def setdefault(self, key, default=None):
+        self.touched.add(key)
+        return super().setdefault(key, default)
+
+    def __getitem__(self, key):
+        self.touched.add(key)
+        return super().__getitem__(key)
+
+
+def test_only_selected_states_touched(monkeypatch):
+    index = SubscriptionIndex([Subscriber("a", "1"), Subscriber("b", "2")])
+    scheduler = PollScheduler(600, 600)
+    idle = homework.new_state(0)
+    scheduler.observe("b", idle, idle, homework.CLOCK.time())
+    monkeypatch.setattr(homework, "SUBSCRIPTIONS", index)
+    monkeypatch.setattr(homework, "SCHEDULER", scheduler)
+    state = TouchedState(b=idle)
+    fetcher = BatchFetcher(lambda token, fromdate: RESPONSE, max_in_flight=1)
+    homework.check_subscribers(FakeFanOut(), fetcher, state)
+    fetcher.close()
+    assert state.touched == {"a"}
+
+
+def test_refused_channel_retried_alone(monkeypatch):
+    index = SubscriptionIndex([
+        Subscriber("a", "personal", channels=("telegram", "file")),
+    ])
+    monkeypatch.setattr(homework, "SUBSCRIPTIONS", index)
+    scheduler = PollScheduler(1, 2, idle_interval=1)
+    monkeypatch.setattr(homework, "SCHEDULER", scheduler)
+    calls = []
+
+    class PartialFanOut:
+        def deliver(self, channels, target, message, key=None):
+            calls.append(channels)
+            return ("file",) if len(calls) == 1 else channels
+
+    fetcher = BatchFetcher(lambda token, fromdate: RESPONSE, max_in_flight=1)
+    state = homework.check_subscribers(PartialFanOut(), fetcher, {})
+    assert state["a"]["prev_report"]["name"] is None
+    state = homework.check_subscribers(PartialFanOut(), fetcher, state)
+    fetcher.close()
+    assert calls == [("telegram", "file"), ("telegram",)]
+    assert state["a"]["prev_report"]["name"] == "hw"
+
+
+def test_undelivered_kept_in_state_and_resent():
+    state = {}
+    homework.keep_undelivered(state, [("telegram", "chat", "Работа принята")])
+    state = json.loads(json.dumps(state))
+    sent = []
+
+    class Queue:
+        def submit(self, channel, target, message, key=None):
+            sent.append((channel, target, message))
+            return True
+
+    homework.redeliver(Queue(), state)
+    assert sent == [("telegram", "chat", "Работа принята")]
+    assert state == {}
+
+
+def test_stage_timeout_skips_only_one_token(monkeypatch):
+    index = SubscriptionIndex([Subscriber("a", "1"), Subscriber("b", "2")])
+    monkeypatch.setattr(homework, "SUBSCRIPTIONS", index)
+    monkeypatch.setattr(homework, "SCHEDULER", PollScheduler(600, 600))
+    stages = []
+
+    class Watchdog:
+        @contextmanager
+        def stage(self, name, cancel=False):
+            stages.append((name, cancel))
+            if len(stages) == 1:
+                raise StageTimeout("Стадия poll прервана")
+            yield
+
+    fetcher = BatchFetcher(lambda token, fromdate: RESPONSE, max_in_flight=1)
+    state = homework.check_subscribers(
+        FakeFanOut(), fetcher, {}, watchdog=Watchdog()
+    )
+    fetcher.close()
+    assert stages == [("poll", True), ("poll", True)]
+    polled = [token for token in "ab" if state[token]["fromdate"] == 20]
+    assert len(polled) == 1
+
+
+def test_unchanged_poll_leaves_snapshot_record_clean(tmp_path, monkeypatch):
+    index = SubscriptionIndex([Subscriber("a", "1")])
+    monkeypatch.setattr(homework, "SUBSCRIPTIONS", index)
+    scheduler = PollScheduler(1, 2, idle_interval=1)
+    monkeypatch.setattr(homework, "SCHEDULER", scheduler)
+    state = SnapshotState(str(tmp_path / "state.snap"))
+    fetcher = BatchFetcher(lambda token, fromdate: RESPONSE, max_in_flight=1)
+    homework.check_subscribers(FakeFanOut(), fetcher, state)
+    state.checkpoint(force=True)
+    homework.check_subscribers(FakeFanOut(), fetcher, state)
+    fetcher.close()
+    assert state._dirty == set()
+    state.close()
+
+
+def test_failure_report_does_not_supersede_queued_verdict():
+    fanout = FakeFanOut()
+    followers = [Subscriber("a", "personal")]
+    homework.notify_followers(fanout, followers, RESPONSE, {}, "вердикт")
+    homework.notify_followers(
+        fanout, followers, RESPONSE, {}, homework.FAILURE_PREFIX + "сбой"
+    )
+    assert fanout.delivered == [
+        ("personal", ("personal", 1)),
+        ("personal", None),
+    ]
+
+
+def test_failure_reported_to_personal_chat_without_token(monkeypatch):
+    index = SubscriptionIndex([
+        Subscriber("secret-token", "personal"),
+        Subscriber("secret-token", "group"),
+        Subscriber("other", "group"),
+    ])
+    monkeypatch.setattr(homework, "SUBSCRIPTIONS", index)
+    monkeypatch.setattr(homework, "SCHEDULER", PollScheduler(600, 600))
+    monkeypatch.setattr(homework, "FAST_PATH", False)
+
+    def refuse(*args, **kwargs):
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(homework.requests, "get", refuse)
+    sent = []
+
+    class Recording(FakeFanOut):
+        def deliver(self, channels, target, message, key=None):
+            sent.append((target, message))
+            return True
+
+    fetcher = BatchFetcher(homework.get_api_answer_for, max_in_flight=1)
+    homework.check_subscribers(Recording(), fetcher, {})
+    fetcher.close()
+
+    assert [target for target, _ in sent] == ["personal"]
+    assert "connection refused" in sent[0][1]
+    assert "secret-token" not in sent[0][1]
@@ -0,0 +1,48 @@
+import threading
+
+from tg_client import ManagedBot, TelegramClients
+
+
+class BlockingBot:
+    def __init__(self):
+        self.release = threading.Event()
+        self.messages = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.release.wait(5)
+        self.messages.append((chat_id, text))
+
+    def get_me(self):
+        return "me"
+
+
+def test_one_client_per_token():
+    clients = TelegramClients(pool_size=8, connect_timeout=1, read_timeout=2)
+    bot = clients.get("123:abc")
+
+    assert clients.get("123:abc") is bot
+    assert clients.get("456:def") is not bot
+    assert bot.bot.request.con_pool_size == 8
+    assert set(clients.stats()) == {"123", "456"}
+
+
+def test_saturation_is_counted():
+    bot = ManagedBot(BlockingBot(), pool_size=2)
+    threads = [
+        threading.Thread(target=bot.send_message, args=(1, str(i)))
+        for i in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    while bot.stats()["in_flight"] < 3:
+        pass
+    bot.bot.release.set()
+    for thread in threads:
+        thread.join()
+
+    stats = bot.stats()
+    assert stats["sent"] == 3
+    assert stats["peak"] == 3
+    assert stats["saturated"] == 1
+    assert stats["in_flight"] == 0
+    assert bot.get_me() == "me"
@@ -0,0 +1,66 @@
+import json
+import logging
+import threading
+
+from notifiers import Channel
+from tracing import Tracer, TraceIdFilter, current_trace_id, propagate
+
+
+def test_sampled_spans_exported_as_trace_events(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer = Tracer(sample_rate=1.0, export_path=str(path))
+    with tracer.trace() as trace_id:
+        with tracer.span("get_api_answer"):
+            pass
+    # файл без закрывающей скобки допустим для формата Trace Event
+    events = json.loads(path.read_text(encoding="UTF-8") + "]")
+    assert [event["name"] for event in events] == ["get_api_answer", "poll"]
+    assert all(event["args"]["trace_id"] == trace_id for event in events)
+    assert all(event["ph"] == "X" for event in events)
+
+
+def test_unsampled_cycle_not_exported(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer = Tracer(sample_rate=0.0, export_path=str(path))
+    with tracer.trace():
+        with tracer.span("get_api_answer"):
+            pass
+    assert not path.exists()
+
+
+def test_trace_id_in_log_records():
+    tracer = Tracer()
+    record = logging.LogRecord("x", logging.INFO, "", 0, "msg", None, None)
+    with tracer.trace() as trace_id:
+        TraceIdFilter().filter(record)
+    assert record.trace_id == trace_id
+    assert current_trace_id() == "-"
+
+
+def test_trace_context_reaches_worker_threads(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer = Tracer(sample_rate=1.0, export_path=str(path))
+    seen = []
+
+    class Notifier:
+        name = "test"
+
+        def send(self, target, message):
+            seen.append(current_trace_id())
+            return True
+
+    channel = Channel(Notifier(), workers=1, tracer=tracer)
+    with tracer.trace() as trace_id:
+        fetch = propagate(tracer.wrap(current_trace_id, "get_api_answer"))
+        worker = threading.Thread(target=lambda: seen.append(fetch()))
+        worker.start()
+        worker.join()
+        channel.submit("chat", "text")
+    channel.close(timeout=5)
+
+    assert seen == [trace_id, trace_id]
+    events = json.loads(path.read_text(encoding="UTF-8") + "]")
+    assert sorted(event["name"] for event in events) == [
+        "get_api_answer", "poll", "send_message"
+    ]
+    assert all(event["args"]["trace_id"] == trace_id for event in events)
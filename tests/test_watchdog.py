@@ -0,0 +1,57 @@
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from exceptions import StageTimeout
+from watchdog import HealthServer, Watchdog
+
+
+@pytest.fixture
+def watchdog():
+    watchdog = Watchdog(deadline=0.2, interval=0.05)
+    watchdog.start()
+    yield watchdog
+    watchdog.stop()
+
+
+def test_stuck_main_stage_cancelled(watchdog):
+    started = time.monotonic()
+    with pytest.raises(StageTimeout):
+        with watchdog.stage("poll", cancel=True):
+            time.sleep(5)
+    assert time.monotonic() - started < 2
+    assert "MainThread" in watchdog.beats
+
+
+def test_stage_not_cancelled_without_flag(watchdog):
+    with watchdog.stage("fetch"):
+        time.sleep(0.3)
+        assert watchdog.overdue()[0][1] == "fetch"
+    assert watchdog.overdue() == []
+
+
+def get(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}") as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_health_endpoints(watchdog):
+    ready = [True]
+    health = HealthServer(
+        watchdog, 0, liveness_timeout=60, is_ready=lambda: ready[0]
+    )
+    health.start()
+    try:
+        assert get(health.port, "/healthz")[0] == 200
+        status, body = get(health.port, "/readyz")
+        assert status == 200 and body["ok"]
+        ready[0] = False
+        assert get(health.port, "/readyz")[0] == 503
+    finally:
+        health.stop()
@@ -0,0 +1,88 @@
+"""Общие клиенты Telegram с настроенным пулом соединений."""
+import threading
+
+import telegram
+from telegram.utils.request import Request
+
+
+class ManagedBot:
+    """
+    Обёртка над telegram.Bot, считающая одновременные отправки.
+    Отправка при занятом пуле (в работе уже `pool_size` запросов)
+    засчитывается как насыщение: пул пора увеличить.
+    """
+
+    def __init__(self, bot, pool_size):
+        self.bot = bot
+        self.pool_size = pool_size
+        self.in_flight = 0
+        self.peak = 0
+        self.sent = 0
+        self.saturated = 0
+        self._lock = threading.Lock()
+
+    def send_message(self, chat_id, text, **kwargs):
+        """bot.send_message с учётом занятости пула."""
+        with self._lock:
+            if self.in_flight >= self.pool_size:
+                self.saturated += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            return self.bot.send_message(chat_id, text, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.sent += 1
+
+    def stats(self):
+        """Счётчики занятости пула."""
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "in_flight": self.in_flight,
+                "peak": self.peak,
+                "sent": self.sent,
+                "saturated": self.saturated,
+            }
+
+    def __getattr__(self, name):
+        return getattr(self.bot, name)
+
+
+class TelegramClients:
+    """
+    Один бот на каждый токен, общий для всех потоков отправки.
+    В отличие от telegram.Bot по умолчанию (пул из одного
+    соединения), пул — `pool_size` соединений с keep-alive и заданными
+    таймаутами.
+    """
+
+    def __init__(self, pool_size, connect_timeout, read_timeout):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._bots = {}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        """Бот для `token`; создаётся при первом запросе."""
+        with self._lock:
+            if token not in self._bots:
+                request = Request(
+                    con_pool_size=self.pool_size,
+                    connect_timeout=self.connect_timeout,
+                    read_timeout=self.read_timeout,
+                )
+                self._bots[token] = ManagedBot(
+                    telegram.Bot(token=token, request=request), self.pool_size
+                )
+            return self._bots[token]
+
+    def stats(self):
+        """Занятость пулов по ботам (по id бота из токена)."""
+        with self._lock:
+            bots = dict(self._bots)
+        return {
+            token.split(":", 1)[0]: bot.stats() for token, bot in bots.items()
+        }
@@ -0,0 +1,126 @@
+"""Лёгкая трассировка стадий цикла опроса."""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+def current_trace_id():
+    """Возвращает id трассы текущего цикла опроса или "-"."""
+    return getattr(_local, "trace_id", "-")
+
+
+def capture():
+    """Контекст трассы текущего потока — для передачи в другой поток."""
+    return current_trace_id(), getattr(_local, "sampled", False)
+
+
+@contextmanager
+def attached(context):
+    """Выполняет блок в контексте трассы `context` из capture()."""
+    previous = capture()
+    _local.trace_id, _local.sampled = context
+    try:
+        yield
+    finally:
+        _local.trace_id, _local.sampled = previous
+
+
+def propagate(func):
+    """
+    Привязывает `func` к трассе, открытой в момент вызова propagate:
+    для задач, которые выполнит пул потоков.
+    """
+    context = capture()
+
+    def bound(*args, **kwargs):
+        with attached(context):
+            return func(*args, **kwargs)
+
+    return bound
+
+
+class TraceIdFilter(logging.Filter):
+    """Добавляет в записи лога поле `trace_id` для форматтера."""
+
+    def filter(self, record):
+        record.trace_id = current_trace_id()
+        return True
+
+
+class Tracer:
+    """
+    Замеряет стадии цикла через time.monotonic и пишет их в файл
+    в формате Trace Event (открывается в chrome://tracing и Perfetto).
+
+    Трассируется доля циклов `sample_rate` (0..1); id трассы
+    попадает в логи всегда, замеры — только для выбранных циклов.
+    """
+
+    def __init__(self, sample_rate=0.0, export_path=None):
+        self.sample_rate = sample_rate
+        self.export_path = export_path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self):
+        """Открывает трассу одного цикла опроса."""
+        _local.trace_id = uuid.uuid4().hex[:16]
+        _local.sampled = random.random() < self.sample_rate
+        try:
+            with self.span("poll"):
+                yield _local.trace_id
+        finally:
+            _local.trace_id = "-"
+            _local.sampled = False
+
+    @contextmanager
+    def span(self, name):
+        """Замеряет стадию `name`, если цикл попал в выборку."""
+        if not getattr(_local, "sampled", False):
+            yield
+            return
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            duration = time.monotonic() - start
+            logging.debug(f"Стадия {name} заняла {duration * 1000:.1f} мс")
+            self._export(name, start, duration)
+
+    def wrap(self, func, name):
+        """Оборачивает `func` в стадию `name`."""
+
+        def traced(*args, **kwargs):
+            with self.span(name):
+                return func(*args, **kwargs)
+
+        return traced
+
+    def _export(self, name, start, duration):
+        if not self.export_path:
+            return
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": int(start * 1e6),
+            "dur": int(duration * 1e6),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {"trace_id": current_trace_id()},
+        }
+        with self._lock:
+            try:
+                is_new = not os.path.exists(self.export_path)
+                with open(self.export_path, "a", encoding="UTF-8") as file:
+                    # закрывающая "]" в формате Trace Event необязательна
+                    file.write("[\n" if is_new else ",\n")
+                    file.write(json.dumps(event, ensure_ascii=False))
+            except OSError as error:
+                logging.error("Не удалось записать трассу: " + str(error))
@@ -0,0 +1,195 @@
+"""Сторож зависших стадий и HTTP-проверки liveness/readiness."""
+import json
+import logging
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from exceptions import StageTimeout
+
+CANCEL_SIGNAL = getattr(signal, "SIGVTALRM", None)
+
+
+class Watchdog:
+    """
+    Следит, сколько выполняется текущая стадия каждого потока.
+
+    Стадию дольше `deadline` секунд сторож считает зависшей: она
+    попадает в readiness, а если открыта с `cancel=True` в главном
+    потоке, прерывается исключением StageTimeout (через сигнал,
+    который будит заблокированный сокет). Прочие потоки прервать
+    нельзя — их ограничивают таймауты запросов.
+    """
+
+    def __init__(self, deadline, interval=1.0):
+        self.deadline = deadline
+        self.interval = interval
+        self.beats = {}
+        self._stages = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._previous = None
+
+    @contextmanager
+    def stage(self, name, cancel=False):
+        """Отмечает стадию `name` текущего потока."""
+        thread = threading.current_thread()
+        with self._lock:
+            self._stages[thread.name] = (
+                name, time.monotonic(), thread.ident, cancel
+            )
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stages.pop(thread.name, None)
+                self._cancelled.discard(thread.ident)
+                self.beats[thread.name] = time.monotonic()
+
+    def watch(self, func, name, cancel=False):
+        """Оборачивает func так, что каждый вызов — стадия `name`."""
+
+        def watched(*args, **kwargs):
+            with self.stage(name, cancel):
+                return func(*args, **kwargs)
+
+        return watched
+
+    def overdue(self):
+        """Зависшие стадии: [(поток, стадия, секунд), ...]."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (worker, name, now - started)
+                for worker, (name, started, _, _) in self._stages.items()
+                if now - started > self.deadline
+            ]
+
+    def status(self):
+        """Состояние потоков для HTTP-проверок."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "stages": {
+                    worker: {"stage": name, "running": round(now - started, 3)}
+                    for worker, (name, started, _, _) in self._stages.items()
+                },
+                "last_beat": {
+                    worker: round(now - beat, 3)
+                    for worker, beat in self.beats.items()
+                },
+            }
+
+    def start(self):
+        """Запускает проверку в фоне; вызывать из главного потока."""
+        if CANCEL_SIGNAL is not None:
+            self._previous = signal.signal(CANCEL_SIGNAL, self._on_cancel)
+        threading.Thread(
+            target=self._monitor, name="watchdog", daemon=True
+        ).start()
+
+    def stop(self):
+        """Останавливает проверку и возвращает обработчик сигнала."""
+        self._stop.set()
+        if self._previous is not None:
+            signal.signal(CANCEL_SIGNAL, self._previous)
+            self._previous = None
+
+    def _monitor(self):
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            with self._lock:
+                stuck = [
+                    (worker, name, ident, cancel)
+                    for worker, (name, started, ident, cancel)
+                    in self._stages.items()
+                    if now - started > self.deadline
+                    and ident not in self._cancelled
+                ]
+                self._cancelled.update(ident for _, _, ident, _ in stuck)
+            for worker, name, ident, cancel in stuck:
+                logging.error(
+                    f"Стадия {name} потока {worker} идёт дольше "
+                    f"{self.deadline} с."
+                )
+                if cancel and CANCEL_SIGNAL is not None:
+                    signal.pthread_kill(ident, CANCEL_SIGNAL)
+
+    def _on_cancel(self, signum, frame):
+        thread = threading.current_thread()
+        with self._lock:
+            stage = self._stages.get(thread.name)
+        if stage and time.monotonic() - stage[1] > self.deadline:
+            raise StageTimeout(
+                f"Стадия {stage[0]} прервана: дольше {self.deadline} с"
+            )
+
+
+class HealthServer:
+    """
+    HTTP-сервер проверок на localhost:
+    GET /healthz — 200, пока главный цикл отмечался не позже
+    `liveness_timeout` секунд назад; GET /readyz — 200, если
+    `is_ready()` и нет зависших стадий. Иначе 503. В теле ответа —
+    стадии потоков и, если передан, словарь `metrics()`.
+    """
+
+    def __init__(self, watchdog, port, liveness_timeout, is_ready,
+                 metrics=dict, main_worker="MainThread", host="127.0.0.1"):
+        self.watchdog = watchdog
+        self.liveness_timeout = liveness_timeout
+        self.is_ready = is_ready
+        self.metrics = metrics
+        self.main_worker = main_worker
+        self.started = time.monotonic()
+        health = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                checks = {"/healthz": health.live, "/readyz": health.ready}
+                if self.path not in checks:
+                    self.send_error(HTTPStatus.NOT_FOUND)
+                    return
+                ok = checks[self.path]()
+                body = json.dumps({
+                    "ok": ok,
+                    **health.watchdog.status(),
+                    "metrics": health.metrics(),
+                }).encode()
+                self.send_response(
+                    HTTPStatus.OK if ok else HTTPStatus.SERVICE_UNAVAILABLE
+                )
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug("Health: " + format % args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self._server.server_address[1]
+
+    def live(self):
+        """Главный цикл отмечался недавно."""
+        beat = self.watchdog.beats.get(self.main_worker, self.started)
+        return time.monotonic() - beat <= self.liveness_timeout
+
+    def ready(self):
+        """Бот готов и ничего не зависло."""
+        return self.is_ready() and not self.watchdog.overdue()
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        threading.Thread(
+            target=self._server.serve_forever, name="health", daemon=True
+        ).start()
+
+    def stop(self):
+        """Останавливает сервер."""
+        self._server.shutdown()
+        self._server.server_close()